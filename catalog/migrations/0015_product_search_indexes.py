@@ -0,0 +1,55 @@
+# Generated by Django 5.1.3 on 2026-10-17 07:10
+
+from django.db import migrations
+
+
+# PostgreSQL-only search indexes backing pricing.views.search_variants.
+# The full-text expression must match SearchVector('product__name', 'product__description', config='english').
+POSTGRES_INDEXES = [
+    (
+        'catalog_product_search_gin',
+        "CREATE INDEX IF NOT EXISTS catalog_product_search_gin ON catalog_product USING gin "
+        "(to_tsvector('english'::regconfig, COALESCE(name, '') || ' ' || COALESCE(description, '')))",
+    ),
+    (
+        'catalog_product_name_trgm',
+        "CREATE INDEX IF NOT EXISTS catalog_product_name_trgm ON catalog_product USING gin "
+        "(UPPER(name::text) gin_trgm_ops)",
+    ),
+    (
+        'variant_code_trgm',
+        "CREATE INDEX IF NOT EXISTS variant_code_trgm ON catalog_productvariant USING gin "
+        "(UPPER(material_code::text) gin_trgm_ops)",
+    ),
+    (
+        'variant_color_trgm',
+        "CREATE INDEX IF NOT EXISTS variant_color_trgm ON catalog_productvariant USING gin "
+        "(UPPER(color_name::text) gin_trgm_ops)",
+    ),
+]
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for _name, sql in POSTGRES_INDEXES:
+        schema_editor.execute(sql)
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _sql in POSTGRES_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0014_remove_productvariant_stock_quantity_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
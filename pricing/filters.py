@@ -0,0 +1,67 @@
+import warnings
+
+from django_filters import rest_framework as filters
+
+from .models import (
+    ProjectLineItem, ProjectLineItemAccessory, ProjectTotals,
+    ProjectPlanImageGroup, ProjectPlanImage,
+)
+
+
+def warn_category_name_filter():
+    """Flag callers still filtering accessories by category name instead of category_id"""
+    warnings.warn(
+        "Filtering accessories by 'category' name is deprecated; resolve the id via "
+        "categories/?q= and pass 'category_id'.",
+        DeprecationWarning,
+        stacklevel=3,
+    )
+
+
+class ProjectLineItemFilter(filters.FilterSet):
+    project = filters.NumberFilter(field_name='project_id')
+
+    class Meta:
+        model = ProjectLineItem
+        fields = ['project']
+
+
+class ProjectLineItemAccessoryFilter(filters.FilterSet):
+    project = filters.NumberFilter(field_name='line_item__project_id')
+    line_item = filters.NumberFilter(field_name='line_item_id')
+    category_id = filters.NumberFilter(field_name='product_variant__product__category_id')
+    # Deprecated: name match across the category join; prefer category_id
+    category = filters.CharFilter(method='filter_category_name')
+
+    class Meta:
+        model = ProjectLineItemAccessory
+        fields = ['project', 'line_item', 'category_id', 'category']
+
+    def filter_category_name(self, queryset, name, value):
+        warn_category_name_filter()
+        return queryset.filter(product_variant__product__category__name__icontains=value)
+
+
+class ProjectTotalsFilter(filters.FilterSet):
+    project = filters.NumberFilter(field_name='project_id')
+
+    class Meta:
+        model = ProjectTotals
+        fields = ['project']
+
+
+class ProjectPlanImageGroupFilter(filters.FilterSet):
+    project = filters.NumberFilter(field_name='project_id')
+
+    class Meta:
+        model = ProjectPlanImageGroup
+        fields = ['project']
+
+
+class ProjectPlanImageFilter(filters.FilterSet):
+    project = filters.NumberFilter(field_name='image_group__project_id')
+    image_group = filters.NumberFilter(field_name='image_group_id')
+
+    class Meta:
+        model = ProjectPlanImage
+        fields = ['project', 'image_group']
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.3 on 2026-10-17 06:02
+
+from django.db import migrations, models
+
+
+def backfill_specificity(apps, schema_editor):
+    LightingRules = apps.get_model('pricing', 'LightingRules')
+    # 0=customer+type, 1=customer, 2=type, 3=global (mirrors LightingRules.compute_specificity)
+    LightingRules.objects.filter(customer__isnull=False, cabinet_type__isnull=False).update(specificity=0)
+    LightingRules.objects.filter(customer__isnull=False, cabinet_type__isnull=True).update(specificity=1)
+    LightingRules.objects.filter(customer__isnull=True, cabinet_type__isnull=False).update(specificity=2)
+    LightingRules.objects.filter(customer__isnull=True, cabinet_type__isnull=True).update(specificity=3)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing', '0007_alter_projectplanimage_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lightingrules',
+            name='specificity',
+            field=models.PositiveSmallIntegerField(db_index=True, default=3, editable=False),
+        ),
+        migrations.RunPython(backfill_specificity, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='lightingrules',
+            index=models.Index(fields=['budget_tier', 'is_active', 'specificity', '-effective_from'], name='lighting_rule_tier_spec_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.3 on 2026-10-17 06:18
+
+from django.db import migrations, models
+
+
+def backfill_search_text(apps, schema_editor):
+    Project = apps.get_model('pricing', 'Project')
+    projects = list(Project.objects.select_related('customer', 'brand'))
+    for project in projects:
+        # mirrors Project.build_search_text
+        project.search_text = ' '.join(filter(None, [project.customer.name, project.status, project.brand.name]))
+    Project.objects.bulk_update(projects, ['search_text'], batch_size=500)
+
+
+def create_trigram_index(apps, schema_editor):
+    # Serves search_text__icontains (UPPER(...) LIKE UPPER(...)) on PostgreSQL
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS pricing_project_search_trgm ON pricing_project '
+        'USING gin (UPPER(search_text::text) gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS pricing_project_search_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing', '0008_lightingrules_specificity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(backfill_search_text, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
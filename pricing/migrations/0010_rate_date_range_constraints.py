@@ -0,0 +1,25 @@
+# Generated by Django 5.1.3 on 2026-10-17 06:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing', '0009_project_search_text'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='cabinettypebrandcharge',
+            constraint=models.CheckConstraint(condition=models.Q(('effective_to__isnull', True), ('effective_to__gte', models.F('effective_from')), _connector='OR'), name='cabinettypebrandcharge_date_range', violation_error_message='effective_to must be >= effective_from'),
+        ),
+        migrations.AddConstraint(
+            model_name='doorfinishrates',
+            constraint=models.CheckConstraint(condition=models.Q(('effective_to__isnull', True), ('effective_to__gte', models.F('effective_from')), _connector='OR'), name='doorfinishrates_date_range', violation_error_message='effective_to must be >= effective_from'),
+        ),
+        migrations.AddConstraint(
+            model_name='finishrates',
+            constraint=models.CheckConstraint(condition=models.Q(('effective_to__isnull', True), ('effective_to__gte', models.F('effective_from')), _connector='OR'), name='finishrates_date_range', violation_error_message='effective_to must be >= effective_from'),
+        ),
+    ]
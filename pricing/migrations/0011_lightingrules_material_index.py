@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-17 06:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0010_remove_customer_status_customer_is_active'),
+        ('pricing', '0010_rate_date_range_constraints'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lightingrules',
+            index=models.Index(fields=['budget_tier', 'is_active', 'cabinet_material', 'cabinet_type'], name='lighting_rule_tier_mat_idx'),
+        ),
+    ]
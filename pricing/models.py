@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from django.core.cache import cache
 from django.core.validators import MinValueValidator
 from decimal import Decimal
 from catalog.models import Category, Brand,ProductVariant
@@ -66,6 +67,13 @@ class FinishRates(TimeStamped):
     
     class Meta:
         unique_together = ('material', 'budget_tier', 'effective_from')
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(effective_to__isnull=True) | models.Q(effective_to__gte=models.F('effective_from')),
+                name='finishrates_date_range',
+                violation_error_message='effective_to must be >= effective_from',
+            ),
+        ]
     
     def __str__(self):
         return f'{self.material.name} {self.budget_tier} @ {self.unit_rate}'
@@ -80,6 +88,13 @@ class DoorFinishRates(TimeStamped):
     
     class Meta:
         unique_together = ('material', 'effective_from')
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(effective_to__isnull=True) | models.Q(effective_to__gte=models.F('effective_from')),
+                name='doorfinishrates_date_range',
+                violation_error_message='effective_to must be >= effective_from',
+            ),
+        ]
     
     def __str__(self):
         return f'{self.material.name} door @ {self.unit_rate}'
@@ -121,6 +136,13 @@ class CabinetTypeBrandCharge(TimeStamped):
     
     class Meta:
         unique_together = ('cabinet_type', 'brand_name', 'effective_from')
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(effective_to__isnull=True) | models.Q(effective_to__gte=models.F('effective_from')),
+                name='cabinettypebrandcharge_date_range',
+                violation_error_message='effective_to must be >= effective_from',
+            ),
+        ]
         verbose_name = "Cabinet Type Brand Charge"
         verbose_name_plural = "Cabinet Type Brand Charges"
     
@@ -156,11 +178,33 @@ class Project(TimeStamped):
     status = models.CharField(max_length=20, choices=STATUS, default='DRAFT')
     scopes = models.JSONField(default=dict, blank=True)  # e.g. {"open": True, "working": True}
     notes = models.TextField(blank=True)
+    # Customer name, status and brand name in one column so list search needs no joins
+    search_text = models.TextField(blank=True, default='', editable=False)
+    
+    def build_search_text(self):
+        return ' '.join(filter(None, [self.customer.name, self.status, self.brand.name]))
+    
+    def save(self, *args, **kwargs):
+        self.search_text = self.build_search_text()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'search_text' not in update_fields:
+            kwargs['update_fields'] = [*update_fields, 'search_text']
+        super().save(*args, **kwargs)
     
     def __str__(self):
         return f'Project {self.id} - {self.customer.name}'
 
 
+def refresh_project_search_text(projects):
+    """Rebuild Project.search_text for a queryset, e.g. after a customer or brand rename"""
+    batch = list(projects.select_related('customer', 'brand').only(
+        'id', 'status', 'search_text', 'customer__name', 'brand__name'
+    ))
+    for project in batch:
+        project.search_text = project.build_search_text()
+    Project.objects.bulk_update(batch, ['search_text'], batch_size=500)
+
+
 class ProjectLineItem(TimeStamped):
     SCOPE_CHOICES = (
         ('OPEN', 'OPEN'), 
@@ -222,7 +266,8 @@ class ProjectLineItemAccessory(TimeStamped):
         # Auto-populate pricing from product variant if not set
         if not self.unit_price:
             self.unit_price = self.product_variant.company_price
-            self.tax_rate_snapshot = self.product_variant.tax_rate
+            # ProductVariant has no tax rate of its own; keep the snapshot default then
+            self.tax_rate_snapshot = getattr(self.product_variant, 'tax_rate', self.tax_rate_snapshot)
         
         # Calculate total
         self.total_price = (self.unit_price * self.qty).quantize(Decimal('0.01'))
@@ -398,10 +443,35 @@ class LightingRules(TimeStamped):
     effective_to = models.DateField(null=True, blank=True)
     currency = models.CharField(max_length=3, default='INR')
     
+    # Precedence among matching rules, lower wins: 0=customer+type, 1=customer, 2=type, 3=global.
+    # Project lookups rank another customer's rule with the global ones (see rule_rank_for)
+    specificity = models.PositiveSmallIntegerField(default=3, db_index=True, editable=False)
+    
     class Meta:
         unique_together = [
             ('customer', 'cabinet_material', 'cabinet_type', 'budget_tier', 'effective_from'),
         ]
+        indexes = [
+            models.Index(
+                fields=['budget_tier', 'is_active', 'specificity', '-effective_from'],
+                name='lighting_rule_tier_spec_idx',
+            ),
+            models.Index(
+                fields=['budget_tier', 'is_active', 'cabinet_material', 'cabinet_type'],
+                name='lighting_rule_tier_mat_idx',
+            ),
+        ]
+    
+    @staticmethod
+    def compute_specificity(customer_id, cabinet_type_id):
+        return (0 if customer_id else 2) + (0 if cabinet_type_id else 1)
+    
+    def save(self, *args, **kwargs):
+        self.specificity = self.compute_specificity(self.customer_id, self.cabinet_type_id)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'specificity' not in update_fields:
+            kwargs['update_fields'] = list(update_fields) + ['specificity']
+        super().save(*args, **kwargs)
     
     def __str__(self):
         type_name = f" - {self.cabinet_type.name}" if self.cabinet_type else ""
@@ -409,6 +479,20 @@ class LightingRules(TimeStamped):
         return f"{self.cabinet_material.name}{type_name} {self.budget_tier}{customer_name}"
 
 
+class ProjectLightingConfigurationManager(models.Manager):
+    def ensure(self, project, defaults=None):
+        """
+        Return the project's configuration, creating it if missing.
+        The insert uses ON CONFLICT DO NOTHING against the project unique key, so
+        concurrent callers never hit IntegrityError and no savepoint is needed.
+        """
+        config = self.filter(project=project).first()
+        if config is None:
+            self.bulk_create([self.model(project=project, **(defaults or {}))], ignore_conflicts=True)
+            config = self.get(project=project)
+        return config
+
+
 class ProjectLightingConfiguration(TimeStamped):
     """Master lighting configuration for a project"""
     project = models.OneToOneField(Project, on_delete=models.CASCADE, related_name='lighting_config')
@@ -425,6 +509,10 @@ class ProjectLightingConfiguration(TimeStamped):
     grand_total_lighting_cost = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     currency = models.CharField(max_length=3, default='INR')
     
+    objects = ProjectLightingConfigurationManager()
+    
+    DEFAULTS = {'work_top_length_mm': 6000}
+    
     def __str__(self):
         return f"Lighting Config - {self.project}"
 
@@ -455,6 +543,12 @@ class ProjectLightingItem(TimeStamped):
     is_active = models.BooleanField(default=True)
     notes = models.TextField(blank=True)
     
+    # Fields written by calculate_costs(), for bulk_update callers
+    COST_FIELDS = [
+        'led_under_wall_cost', 'led_work_top_cost', 'led_skirting_cost',
+        'spot_lights_cost', 'total_cost',
+    ]
+    
     class Meta:
         unique_together = [
             ('project', 'cabinet_material', 'cabinet_type'),
@@ -528,105 +622,235 @@ def get_applicable_lighting_rules(project, cabinet_material=None, cabinet_type=N
             models.Q(cabinet_type=cabinet_type) | models.Q(cabinet_type__isnull=True)
         )
     
-    # Order by specificity: customer-specific first, then type-specific, then general
-    return rules.order_by(
-        models.Case(
-            models.When(customer=project.customer, then=models.Value(0)),
-            default=models.Value(1)
-        ),
-        models.Case(
-            models.When(cabinet_type__isnull=False, then=models.Value(0)),
-            default=models.Value(1)
+    # Order by specificity: this customer's rules first, then type-specific, then general
+    return rules.order_by(rule_rank_for(project.customer_id), '-effective_from')
+
+
+def rule_rank_for(customer_id):
+    """
+    LightingRules.specificity as seen from a customer's project: a rule for another
+    customer (reachable through is_global) ranks with the global rules, not above them.
+    """
+    return models.Case(
+        models.When(
+            models.Q(customer__isnull=False) & ~models.Q(customer_id=customer_id),
+            then=models.F('specificity') + 2,
         ),
-        '-effective_from'
+        default=models.F('specificity'),
+        output_field=models.PositiveSmallIntegerField(),
+    )
+
+
+def _empty_dimensions():
+    return {'wall_width': 0, 'base_width': 0, 'wall_count': 0}
+
+
+LIGHTING_CATEGORY_NAMES = ('WALL', 'BASE')
+LIGHTING_CATEGORIES_CACHE_KEY = 'pricing:lighting_categories'
+LIGHTING_CATEGORIES_CACHE_TIMEOUT = 60 * 10
+
+
+def lighting_category_names():
+    """{category_id: name} for the WALL/BASE categories; cached, and cleared by pricing.signals"""
+    return cache.get_or_set(
+        LIGHTING_CATEGORIES_CACHE_KEY,
+        lambda: {
+            category_id: name for name, category_id in
+            Category.objects.filter(name__in=LIGHTING_CATEGORY_NAMES).values_list('name', 'id')
+        },
+        LIGHTING_CATEGORIES_CACHE_TIMEOUT,
     )
 
 
-def calculate_project_lighting_totals(project):
-    """Calculate total lighting costs from all active lighting items"""
-    config, created = ProjectLightingConfiguration.objects.get_or_create(
-        project=project,
-        defaults={'work_top_length_mm': 6000}  # Default value
+def get_lighting_dimensions(project):
+    """
+    Wall/base cabinet widths and counts per (material_id, type_id), from one grouped query.
+    Every material/type combination on the project gets an entry, even if it has no
+    WALL/BASE lines, so the keys double as the project's distinct combinations.
+    """
+    # Group on the category FK column and resolve WALL/BASE from the cached ids, so the
+    # category table never joins in
+    rows = project.lines.values(
+        'cabinet_material_id', 'cabinet_type_id', 'cabinet_type__category_id'
+    ).annotate(
+        total_width=models.Sum(models.F('width_mm') * models.F('qty'), output_field=models.IntegerField()),
+        total_qty=models.Sum('qty'),
+    ).order_by()
+
+    categories = lighting_category_names()
+    by_mat_type = {}
+    for row in rows:
+        bucket = by_mat_type.setdefault(
+            (row['cabinet_material_id'], row['cabinet_type_id']), _empty_dimensions()
+        )
+        category = categories.get(row['cabinet_type__category_id'])
+        if category == 'WALL':
+            bucket['wall_width'] += row['total_width'] or 0
+            bucket['wall_count'] += row['total_qty'] or 0
+        elif category == 'BASE':
+            bucket['base_width'] += row['total_width'] or 0
+    return by_mat_type
+
+
+def get_project_material_type_combinations(project):
+    """
+    Distinct (material_id, type_id) pairs on the project's lines, memoized on the instance.
+    auto_create_lighting_items_for_project seeds the memo from its dimensions index.
+    """
+    combinations = getattr(project, '_material_type_combinations', None)
+    if combinations is None:
+        combinations = list(project.lines.values_list(
+            'cabinet_material_id', 'cabinet_type_id'
+        ).distinct().order_by())
+        project._material_type_combinations = combinations
+    return combinations
+
+
+def calculate_project_lighting_totals(project, dimensions=None):
+    """
+    Calculate total lighting costs from all active lighting items.
+    Pass `dimensions` from get_lighting_dimensions() to reuse an already-fetched index.
+    """
+    config = ProjectLightingConfiguration.objects.ensure(
+        project, ProjectLightingConfiguration.DEFAULTS
     )
     
     # Calculate totals from line items
-    wall_items = project.lines.filter(cabinet_type__category__name='WALL')
-    base_items = project.lines.filter(cabinet_type__category__name='BASE')
-    
-    config.total_wall_cabinet_width_mm = sum(item.width_mm * item.qty for item in wall_items)
-    config.total_base_cabinet_width_mm = sum(item.width_mm * item.qty for item in base_items)
-    config.total_wall_cabinet_count = sum(item.qty for item in wall_items)
+    if dimensions is None:
+        dimensions = get_lighting_dimensions(project)
+    totals = _empty_dimensions()
+    for dims in dimensions.values():
+        for key in totals:
+            totals[key] += dims[key]
+    config.total_wall_cabinet_width_mm = totals['wall_width']
+    config.total_base_cabinet_width_mm = totals['base_width']
+    config.total_wall_cabinet_count = totals['wall_count']
     
     # Calculate grand total from all lighting items
-    active_items = project.lighting_items.filter(is_active=True)
-    config.grand_total_lighting_cost = sum(item.total_cost for item in active_items)
+    config.grand_total_lighting_cost = project.lighting_items.filter(
+        is_active=True
+    ).aggregate(g=models.Sum('total_cost'))['g'] or Decimal('0')
     
-    config.save()
+    config.save(update_fields=[
+        'total_wall_cabinet_width_mm', 'total_base_cabinet_width_mm', 'total_wall_cabinet_count',
+        'grand_total_lighting_cost', 'updated_at',
+    ])
     return config
 
 
+def _rule_specificity_key(rule, customer_id):
+    """Sort key mirroring the ordering of get_applicable_lighting_rules"""
+    specificity = rule.specificity
+    if rule.customer_id is not None and rule.customer_id != customer_id:
+        specificity += 2
+    return (specificity, -rule.effective_from.toordinal())
+
+
+LIGHTING_RULES_CACHE_VERSION_KEY = 'pricing:lighting_rules:version'
+LIGHTING_RULES_CACHE_TIMEOUT = 60 * 10
+
+
+def invalidate_lighting_rules_cache():
+    """Retire every cached rule list; called from pricing.signals"""
+    cache.set(LIGHTING_RULES_CACHE_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def _cached_applicable_lighting_rules(project):
+    """Applicable rules for the project's (customer, budget tier), cached across requests"""
+    version = cache.get_or_set(LIGHTING_RULES_CACHE_VERSION_KEY, uuid.uuid4().hex, None)
+    key = f'pricing:lighting_rules:{version}:{project.customer_id}:{project.budget_tier}'
+    return cache.get_or_set(
+        key,
+        lambda: list(get_applicable_lighting_rules(project).order_by().select_related(
+            'cabinet_material', 'cabinet_type', 'cabinet_type__category', 'customer'
+        )),
+        LIGHTING_RULES_CACHE_TIMEOUT,
+    )
+
+
+def get_all_applicable_lighting_rules(project, material_ids=None):
+    """
+    Fetch every rule applicable to a project (cached per customer and budget tier) and
+    bucket them by (cabinet_material_id, cabinet_type_id), each bucket ordered best-first.
+    Pass `material_ids` to skip rules for materials the caller will never look up.
+    Resolve a combination with lighting_rules_for().
+    """
+    rules = _cached_applicable_lighting_rules(project)
+    if material_ids is not None:
+        rules = [rule for rule in rules if rule.cabinet_material_id in material_ids]
+    buckets = {}
+    ordered = sorted(rules, key=lambda rule: _rule_specificity_key(rule, project.customer_id))
+    for rank, rule in enumerate(ordered):
+        rule.specificity_rank = rank
+        buckets.setdefault((rule.cabinet_material_id, rule.cabinet_type_id), []).append(rule)
+    return buckets
+
+
+def lighting_rules_for(buckets, material_id, type_id=None):
+    """Rules for a material/type combination, best first (see get_applicable_lighting_rules)"""
+    if type_id is None:
+        candidates = [
+            rule for (rule_material_id, _), bucket in buckets.items()
+            if rule_material_id == material_id
+            for rule in bucket
+        ]
+    else:
+        candidates = buckets.get((material_id, type_id), []) + buckets.get((material_id, None), [])
+    return sorted(candidates, key=lambda r: r.specificity_rank)
+
+
+@transaction.atomic
 def auto_create_lighting_items_for_project(project):
     """Automatically create lighting items based on project line items"""
-    # Get unique material/type combinations from line items
-    combinations = project.lines.values(
-        'cabinet_material', 'cabinet_type', 
-        'cabinet_material__name', 'cabinet_type__name'
-    ).distinct()
+    # Unique material/type combinations and their dimensions, in one grouped query
+    dimensions = get_lighting_dimensions(project)
+    project._material_type_combinations = list(dimensions)
     
-    created_items = []
+    existing_pairs = set(project.lighting_items.values_list(
+        'cabinet_material_id', 'cabinet_type_id'
+    ))
+    combinations = [combo for combo in dimensions if combo not in existing_pairs]
+    if not combinations:
+        transaction.on_commit(lambda: calculate_project_lighting_totals(project, dimensions))
+        return []
     
-    for combo in combinations:
-        material_id = combo['cabinet_material']
-        type_id = combo['cabinet_type']
-        
-        # Check if lighting item already exists
-        existing = project.lighting_items.filter(
-            cabinet_material_id=material_id,
-            cabinet_type_id=type_id
-        ).first()
-        
-        if existing:
-            continue
-            
+    # All candidate rules in one query
+    rule_buckets = get_all_applicable_lighting_rules(project, {m for m, _ in combinations})
+    
+    new_items = []
+    
+    for material_id, type_id in combinations:
         # Find applicable rule
-        material = Materials.objects.get(id=material_id)
-        cabinet_type = CabinetTypes.objects.get(id=type_id) if type_id else None
-        
-        rules = get_applicable_lighting_rules(project, material, cabinet_type)
-        rule = rules.first()
+        rules = lighting_rules_for(rule_buckets, material_id, type_id)
+        rule = rules[0] if rules else None
         
         if not rule:
             continue
             
-        # Calculate dimensions for this material/type combination
-        relevant_items = project.lines.filter(
-            cabinet_material_id=material_id,
-            cabinet_type_id=type_id
-        )
-        
-        wall_items = relevant_items.filter(cabinet_type__category__name='WALL')
-        base_items = relevant_items.filter(cabinet_type__category__name='BASE')
+        # Dimensions for this material/type combination
+        dims = dimensions[(material_id, type_id)]
+        wall_width = dims['wall_width']
+        base_width = dims['base_width']
+        wall_count = dims['wall_count']
         
-        wall_width = sum(item.width_mm * item.qty for item in wall_items)
-        base_width = sum(item.width_mm * item.qty for item in base_items)
-        wall_count = sum(item.qty for item in wall_items)
-        
-        # Create lighting item
-        lighting_item = ProjectLightingItem.objects.create(
+        lighting_item = ProjectLightingItem(
             project=project,
             lighting_rule=rule,
-            cabinet_material=material,
-            cabinet_type=cabinet_type,
+            # ids come straight from the grouped line query; no need to load the instances
+            cabinet_material_id=material_id,
+            cabinet_type_id=type_id,
             wall_cabinet_width_mm=wall_width,
             base_cabinet_width_mm=base_width,
             wall_cabinet_count=wall_count,
             work_top_length_mm=wall_width if wall_width > 0 else 0  # Default to wall width
         )
-        
-        created_items.append(lighting_item)
+        # bulk_create bypasses save(), so compute costs here
+        lighting_item.calculate_costs()
+        new_items.append(lighting_item)
+    
+    created_items = ProjectLightingItem.objects.bulk_create(new_items, batch_size=500)
     
-    # Recalculate project totals
-    calculate_project_lighting_totals(project)
+    # Recalculate project totals once the inserts are committed
+    transaction.on_commit(lambda: calculate_project_lighting_totals(project, dimensions))
     
     return created_items
-
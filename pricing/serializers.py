@@ -9,6 +9,7 @@ from .models import (
 
 from catalog.models import Brand
 from catalog.models import Category
+from catalog.models import ProductVariant, ProductImage
 from customers.models import Customer
 from customers.serializers import CustomerSerializer
 from catalog.serializers import  CategorySerializer
@@ -174,6 +175,75 @@ class ProjectLineItemAccessorySerializer(serializers.ModelSerializer):
             return obj.product_variant.image.url
         return None
 
+class ProjectLineItemAccessoryListSerializer(serializers.ModelSerializer):
+    """Thin serializer for accessory lists; renders only columns in ONLY_FIELDS"""
+    product_name = serializers.CharField(source='product_variant.product.name', read_only=True)
+    brand_name = serializers.CharField(source='product_variant.product.brand.name', read_only=True)
+    color_name = serializers.CharField(source='product_variant.color_name', read_only=True)
+    material_code = serializers.CharField(source='product_variant.material_code', read_only=True)
+    accessory_name = serializers.ReadOnlyField()
+    accessory_image_url = serializers.SerializerMethodField()
+    
+    ONLY_FIELDS = [
+        'id', 'line_item_id', 'product_variant_id', 'qty', 'unit_price',
+        'tax_rate_snapshot', 'total_price', 'is_active', 'created_at', 'updated_at',
+        'product_variant__id', 'product_variant__color_name',
+        'product_variant__material_code', 'product_variant__image',
+        'product_variant__product__id', 'product_variant__product__name',
+        'product_variant__product__brand__id', 'product_variant__product__brand__name',
+    ]
+    
+    class Meta:
+        model = ProjectLineItemAccessory
+        fields = [
+            'id', 'line_item', 'product_variant', 'product_name', 'brand_name',
+            'color_name', 'material_code', 'accessory_name', 'accessory_image_url',
+            'qty', 'unit_price', 'tax_rate_snapshot', 'total_price',
+            'is_active', 'created_at', 'updated_at'
+        ]
+    
+    def get_accessory_image_url(self, obj):
+        image = obj.product_variant.image
+        if not image:
+            return None
+        request = self.context.get('request')
+        return request.build_absolute_uri(image.url) if request else image.url
+
+
+class AccessoryVariantImageSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ProductImage
+        fields = ['id', 'image', 'is_primary', 'sort_order']
+
+
+class AvailableProductVariantSerializer(serializers.ModelSerializer):
+    """Slim variant serializer for the accessory picker"""
+    product_name = serializers.CharField(source='product.name', read_only=True)
+    brand_name = serializers.CharField(source='product.brand.name', read_only=True)
+    category_name = serializers.CharField(source='product.category.name', read_only=True)
+    dimensions_display = serializers.ReadOnlyField()
+    images = AccessoryVariantImageSerializer(many=True, read_only=True)
+    
+    # Columns the queryset must load (see ProjectLineItemAccessoryViewSet.available_products)
+    ONLY_FIELDS = [
+        'id', 'product_id', 'color_name', 'material_code', 'image',
+        'size_width', 'size_height', 'size_depth',
+        'mrp', 'discount_rate', 'company_price', 'sku_code', 'is_active',
+        'product__id', 'product__name',
+        'product__brand__id', 'product__brand__name',
+        'product__category__id', 'product__category__name',
+    ]
+    
+    class Meta:
+        model = ProductVariant
+        fields = [
+            'id', 'product', 'product_name', 'brand_name', 'category_name',
+            'color_name', 'material_code', 'image', 'images',
+            'size_width', 'size_height', 'size_depth', 'dimensions_display',
+            'mrp', 'discount_rate', 'company_price', 'sku_code', 'is_active'
+        ]
+
+
 class ProjectLineItemSerializer(serializers.ModelSerializer):
     cabinet_type_detail = CabinetTypesSerializer(source='cabinet_type', read_only=True)
     cabinet_material_detail = MaterialsSerializer(source='cabinet_material', read_only=True)
@@ -463,16 +533,20 @@ class ProjectLightingConfigurationSerializer(serializers.ModelSerializer):
             'total_wall_cabinet_count', 'grand_total_lighting_cost', 'created_at', 'updated_at'
         ]
     
+    def _active_items(self, obj):
+        # .all() reuses the viewset's prefetch of project__lighting_items
+        return [item for item in obj.project.lighting_items.all() if item.is_active]
+    
     def get_active_items_count(self, obj):
-        return obj.project.lighting_items.filter(is_active=True).count()
+        return len(self._active_items(obj))
     
     def get_total_led_cost(self, obj):
-        items = obj.project.lighting_items.filter(is_active=True)
+        items = self._active_items(obj)
         return sum(
             item.led_under_wall_cost + item.led_work_top_cost + item.led_skirting_cost 
             for item in items
         )
     
     def get_total_spot_cost(self, obj):
-        items = obj.project.lighting_items.filter(is_active=True)
+        items = self._active_items(obj)
         return sum(item.spot_lights_cost for item in items)
\ No newline at end of file
@@ -0,0 +1,88 @@
+from django.db.models.signals import post_save, post_delete
+from django.core.cache import cache
+from django.dispatch import receiver
+from catalog.models import Brand, Category, Product, ProductVariant
+from customers.models import Customer
+from pricing.models import (
+    FinishRates, DoorFinishRates, CabinetTypeBrandCharge, GeometryRule,
+    Materials, CabinetTypes, LightingRules, Project,
+    LIGHTING_CATEGORIES_CACHE_KEY, invalidate_lighting_rules_cache, refresh_project_search_text,
+)
+
+
+@receiver([post_save, post_delete], sender=FinishRates)
+@receiver([post_save, post_delete], sender=DoorFinishRates)
+@receiver([post_save, post_delete], sender=CabinetTypeBrandCharge)
+def invalidate_rate_caches(sender, instance, **kwargs):
+    """
+    Retire the cached active-rates payloads whenever a rate row changes.
+    """
+    from pricing.views import invalidate_active_rates
+    invalidate_active_rates()
+
+
+@receiver([post_save, post_delete], sender=Materials)
+@receiver([post_save, post_delete], sender=CabinetTypes)
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_master_caches(sender, instance, **kwargs):
+    """
+    Retire the material/cabinet type maps, the WALL/BASE category ids and the
+    active-rates payloads that embed their details.
+    """
+    from pricing.views import clear_master_caches, invalidate_active_rates
+    clear_master_caches()
+    cache.delete(LIGHTING_CATEGORIES_CACHE_KEY)
+    invalidate_active_rates()
+
+
+@receiver([post_save, post_delete], sender=CabinetTypes)
+def invalidate_cabinet_type_lookup(sender, instance, **kwargs):
+    """
+    Forget the cached existence check used by ProjectCalculationAPI.
+    """
+    from pricing.views import cabinet_type_cache_key
+    cache.delete(cabinet_type_cache_key(instance.pk))
+
+
+@receiver([post_save, post_delete], sender=LightingRules)
+@receiver([post_save, post_delete], sender=Materials)
+@receiver([post_save, post_delete], sender=CabinetTypes)
+@receiver([post_save, post_delete], sender=Customer)
+def invalidate_lighting_rules(sender, instance, **kwargs):
+    """
+    Cached rule lists embed their material, cabinet type and customer; drop them on change.
+    """
+    invalidate_lighting_rules_cache()
+
+
+@receiver([post_save, post_delete], sender=GeometryRule)
+def invalidate_geometry_cache(sender, instance, **kwargs):
+    """
+    Retire the cached geometry parameters used by compute_sqft when a rule changes.
+    """
+    from pricing.views import invalidate_geometry_cache
+    invalidate_geometry_cache()
+
+
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=ProductVariant)
+def invalidate_accessory_categories(sender, instance, **kwargs):
+    """
+    Drop the cached accessory category list when the catalog behind it changes.
+    """
+    from pricing.views import ACCESSORY_CATEGORIES_CACHE_KEY
+    cache.delete(ACCESSORY_CATEGORIES_CACHE_KEY)
+
+
+@receiver(post_save, sender=Customer)
+@receiver(post_save, sender=Brand)
+def refresh_project_search(sender, instance, **kwargs):
+    """
+    Keep Project.search_text in step when a customer or brand is renamed.
+    """
+    if sender is Customer:
+        projects = Project.objects.filter(customer=instance)
+    else:
+        projects = Project.objects.filter(brand=instance)
+    refresh_project_search_text(projects)
@@ -0,0 +1,95 @@
+from celery import shared_task
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.timezone import now
+
+from pricing.models import (
+    Project, ProjectLightingItem,
+    calculate_project_lighting_totals, auto_create_lighting_items_for_project,
+)
+
+
+LIGHTING_RECALC_CHUNK_SIZE = 500
+
+
+def lighting_totals_lock_key(project_id):
+    """Held while a lighting totals refresh is queued, so bursts of writes share one run"""
+    return f'pricing:lighting_totals_queued:{project_id}'
+
+
+def _recalculate_lighting_items(project):
+    """Recompute costs for the project's active lighting items, writing back only changed rows in chunks"""
+    items = project.lighting_items.filter(is_active=True).select_related('lighting_rule')
+    fields = ProjectLightingItem.COST_FIELDS + ['updated_at']
+    updated_at = now()
+    changed = []
+    written = 0
+    # Stream the rows so memory stays bounded by one chunk on large projects
+    for item in items.iterator(chunk_size=LIGHTING_RECALC_CHUNK_SIZE):
+        before = [getattr(item, field) for field in ProjectLightingItem.COST_FIELDS]
+        item.calculate_costs()
+        if before == [getattr(item, field) for field in ProjectLightingItem.COST_FIELDS]:
+            continue
+        # bulk_update bypasses save(), so auto_now is not applied
+        item.updated_at = updated_at
+        changed.append(item)
+        if len(changed) >= LIGHTING_RECALC_CHUNK_SIZE:
+            ProjectLightingItem.objects.bulk_update(changed, fields)
+            written += len(changed)
+            changed = []
+    if changed:
+        ProjectLightingItem.objects.bulk_update(changed, fields)
+        written += len(changed)
+    return written
+
+
+@shared_task
+def recalc_project(project_id):
+    """Recompute every line item of a project and its totals"""
+    from pricing.views import recompute_lines, recompute_totals
+
+    project = Project.objects.get(pk=project_id)
+    with transaction.atomic():
+        line_sums = recompute_lines(project)
+        recompute_totals(project, line_sums=line_sums)
+    return {'project_id': project_id}
+
+
+@shared_task
+def recalc_project_lighting(project_id):
+    """Recalculate lighting item costs, lighting totals and project totals"""
+    from pricing.views import recompute_totals
+
+    project = Project.objects.get(pk=project_id)
+    with transaction.atomic():
+        _recalculate_lighting_items(project)
+        config = calculate_project_lighting_totals(project)
+        recompute_totals(project)
+    return {
+        'project_id': project_id,
+        'grand_total_lighting_cost': str(config.grand_total_lighting_cost),
+    }
+
+
+@shared_task
+def refresh_lighting_totals(project_id):
+    """Recompute a project's lighting configuration totals"""
+    # Release first so writes landing while this runs queue a fresh refresh
+    cache.delete(lighting_totals_lock_key(project_id))
+    project = Project.objects.get(pk=project_id)
+    config = calculate_project_lighting_totals(project)
+    return {
+        'project_id': project_id,
+        'grand_total_lighting_cost': str(config.grand_total_lighting_cost),
+    }
+
+
+@shared_task
+def auto_create_project_lighting(project_id):
+    """Create missing lighting items for a project from its line items"""
+    project = Project.objects.get(pk=project_id)
+    created_items = auto_create_lighting_items_for_project(project)
+    return {
+        'project_id': project_id,
+        'created_item_ids': [item.pk for item in created_items],
+    }
@@ -1,3 +1,63 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from catalog.models import Brand, Category, Product, ProductVariant
+from customers.models import Customer
+from pricing.models import CabinetTypes, Materials, Project, ProjectLineItem, ProjectLineItemAccessory
+
+
+class ProjectLineItemAccessoryBulkCreateTests(TestCase):
+    url = '/api/pricing/project-line-item-accessories/'
+
+    @classmethod
+    def setUpTestData(cls):
+        brand = Brand.objects.create(name='Brand')
+        category = Category.objects.create(name='Hardware')
+        product = Product.objects.create(category=category, brand=brand, name='Hinge')
+        cls.variants = [
+            ProductVariant.objects.create(product=product, material_code=f'H-{i}', mrp=Decimal('250.00'))
+            for i in range(3)
+        ]
+        material = Materials.objects.create(name='Oak')
+        project = Project.objects.create(
+            customer=Customer.objects.create(name='Customer', location='Kochi'),
+            brand=brand,
+            budget_tier='LUXURY',
+        )
+        cls.line = ProjectLineItem.objects.create(
+            project=project,
+            cabinet_type=CabinetTypes.objects.create(name='Wall 600'),
+            width_mm=600, depth_mm=350, height_mm=720,
+            cabinet_material=material, door_material=material,
+        )
+        cls.user = get_user_model().objects.create_superuser('admin', 'password')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_create_fills_pricing_fields_sent_by_the_client(self):
+        """Items carrying tax_rate_snapshot and a missing/zero unit_price get variant pricing"""
+        payload = [
+            {'line_item': self.line.pk, 'product_variant': self.variants[0].pk, 'qty': 2,
+             'tax_rate_snapshot': '12.00'},
+            {'line_item': self.line.pk, 'product_variant': self.variants[1].pk, 'qty': 1,
+             'unit_price': '0', 'tax_rate_snapshot': '5.00'},
+            {'line_item': self.line.pk, 'product_variant': self.variants[2].pk, 'qty': 3,
+             'unit_price': '100.00', 'tax_rate_snapshot': '5.00'},
+        ]
+
+        response = self.client.post(self.url, payload, format='json')
 
-# Create your tests here.
+        self.assertEqual(response.status_code, 201, response.content)
+        prices = dict(
+            ProjectLineItemAccessory.objects.values_list('product_variant_id', 'total_price')
+        )
+        self.assertEqual(prices, {
+            self.variants[0].pk: Decimal('500.00'),
+            self.variants[1].pk: Decimal('250.00'),
+            self.variants[2].pk: Decimal('300.00'),
+        })
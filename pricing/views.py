@@ -1,22 +1,45 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
 from decimal import Decimal
-from django.db import transaction
-from django.db.models import Sum, F, Q, Case, When, Value
+from celery.backends.base import DisabledBackend
+from celery.result import AsyncResult
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.core.validators import validate_image_file_extension
+from django.db import connection, transaction
+from django.db.models import Sum, F, Q, Max, Count, Prefetch, OuterRef, Subquery, Value, DecimalField
+from django.db.models.functions import Coalesce
+from django.utils.http import parse_etags, quote_etag
 from django.utils.timezone import now
-from django.db import transaction
+from PIL import Image
 # from rest_framework import viewsets, status
 from rest_framework.decorators import action
 
+from rest_framework.pagination import CursorPagination
 from rest_framework.parsers import MultiPartParser, FormParser
 from django.shortcuts import get_object_or_404
 
-from rest_framework import viewsets, status, filters
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import viewsets, status, filters, serializers
 
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
 from rest_framework.views import APIView
 
 from .models import *
+from .filters import (
+    ProjectLineItemFilter, ProjectLineItemAccessoryFilter, ProjectTotalsFilter,
+    ProjectPlanImageGroupFilter, ProjectPlanImageFilter, warn_category_name_filter,
+)
+from .tasks import (
+    recalc_project, recalc_project_lighting, auto_create_project_lighting,
+    refresh_lighting_totals, lighting_totals_lock_key,
+)
 from .serializers import (
     GeometryRuleSerializer, ProjectLightingConfigurationSerializer, ProjectPlanImageGroupListSerializer, ProjectPlanImageGroupSerializer, ProjectSerializer, ProjectLineItemSerializer,
     ProjectLineItemAccessorySerializer, ProjectTotalsSerializer, 
@@ -24,7 +47,8 @@ from .serializers import (
     DoorFinishRatesSerializer, CabinetTypesSerializer, 
     CabinetTypeBrandChargeSerializer, AccessoriesSerializer,
     BrandSerializer, CustomerSerializer, CategorySerializer,
-    LightingRulesSerializer,ProjectLightingItemSerializer
+    LightingRulesSerializer,ProjectLightingItemSerializer,
+    AvailableProductVariantSerializer, ProjectLineItemAccessoryListSerializer
 )
 
 
@@ -41,143 +65,797 @@ def _active_on(qs, eff_date: date):
     )
 
 
-def _cabinet_rate(material, tier, eff_date):
-    """Get cabinet material rate for given tier and date"""
-    row = _active_on(
-        FinishRates.objects.filter(material=material, budget_tier=tier), 
-        eff_date
-    ).order_by('-effective_from').first()
-    return Decimal(row.unit_rate) if row else Decimal('0')
+MASTER_CACHE_VERSION_KEY = 'pricing:master:version'
+MASTER_CACHE_TIMEOUT = 60 * 5
+_master_maps = {}
 
 
-def _door_rate(material, eff_date):
-    """Get door material rate for given date"""
-    row = _active_on(
-        DoorFinishRates.objects.filter(material=material), 
-        eff_date
-    ).order_by('-effective_from').first()
-    return Decimal(row.unit_rate) if row else Decimal('0')
+def _master_map(name, load):
+    """
+    In-process map loaded by `load`, reloaded after MASTER_CACHE_TIMEOUT seconds or once
+    pricing.signals bumps the version in the default cache. That cache is shared Redis
+    whenever settings.CACHES is configured, so a bump from any process reaches every
+    worker; under the local LocMem fallback only the TTL bounds other processes.
+    """
+    version = cache.get_or_set(MASTER_CACHE_VERSION_KEY, time.time_ns(), None)
+    entry = _master_maps.get(name)
+    if entry is None or entry[0] != version or entry[1] <= time.monotonic():
+        entry = (version, time.monotonic() + MASTER_CACHE_TIMEOUT, load())
+        _master_maps[name] = entry
+    return entry[2]
 
 
-def _brand_base(cabinet_type, brand_name, eff_date):
-    """Get brand base charge for cabinet type and date"""
-    row = _active_on(
-        CabinetTypeBrandCharge.objects.filter(
-            cabinet_type=cabinet_type, 
-            brand_name=brand_name
-        ), 
-        eff_date
-    ).order_by('-effective_from').first()
-    return Decimal(row.standard_accessory_charge) if row else Decimal('0')
+def _materials_by_id():
+    """Every material keyed by id; the table is small and near-static"""
+    return _master_map('materials', Materials.objects.in_bulk)
 
 
-def compute_sqft(cabinet_type, w, d, h):
-    """Compute cabinet and door square footage based on dimensions"""
+def _cabinet_types_by_id():
+    """Every cabinet type (with its category) keyed by id"""
+    return _master_map('cabinet_types', CabinetTypes.objects.select_related('category').in_bulk)
+
+
+def clear_master_caches():
+    """Retire the material/cabinet type maps in every process sharing the cache; called from pricing.signals"""
+    cache.set(MASTER_CACHE_VERSION_KEY, time.time_ns(), None)
+
+
+RATES_CACHE_VERSION_KEY = 'pricing:rates:version'
+ACTIVE_RATES_CACHE_TIMEOUT = 60 * 5
+
+
+def _rates_cache_version():
+    """Version stamp embedded in rate cache keys; bumping it orphans every cached entry"""
+    return cache.get_or_set(RATES_CACHE_VERSION_KEY, time.time_ns(), None)
+
+
+def invalidate_active_rates():
+    """Retire every cached active-rates payload by bumping the key version"""
+    cache.set(RATES_CACHE_VERSION_KEY, time.time_ns(), None)
+
+
+# Bump the suffix when the CategorySerializer shape changes
+ACCESSORY_CATEGORIES_CACHE_KEY = 'pricing:accessory_categories:v1'
+ACCESSORY_CATEGORIES_CACHE_TIMEOUT = 60 * 10
+
+
+def _active_rates_payload(eff_date):
+    """Serialized active rates for a date, cached for a few minutes"""
+    key = f'pricing:active_rates:{_rates_cache_version()}:{eff_date.isoformat()}'
+    payload = cache.get(key)
+    if payload is None:
+        finish_rates = _active_on(FinishRates.objects.all(), eff_date).select_related('material')
+        door_rates = _active_on(DoorFinishRates.objects.all(), eff_date).select_related('material')
+        brand_charges = _active_on(CabinetTypeBrandCharge.objects.all(), eff_date).select_related('cabinet_type')
+        payload = {
+            'date': eff_date,
+            'finish_rates': FinishRatesSerializer(finish_rates, many=True).data,
+            'door_rates': DoorFinishRatesSerializer(door_rates, many=True).data,
+            'brand_charges': CabinetTypeBrandChargeSerializer(brand_charges, many=True).data
+        }
+        cache.set(key, payload, ACTIVE_RATES_CACHE_TIMEOUT)
+    return payload
+
+
+CABINET_TYPE_CACHE_TIMEOUT = 60 * 60
+
+
+def cabinet_type_cache_key(cabinet_type_id):
+    return f'pricing:cabinet_type_exists:{cabinet_type_id}'
+
+
+def _cabinet_type_exists(cabinet_type_id):
+    """
+    Whether a cabinet type id is valid; cached, and cleared by pricing.signals on change.
+    Only hits are cached, so a newly created type is found at once by every process.
+    """
+    cabinet_type_id = int(cabinet_type_id)
+    key = cabinet_type_cache_key(cabinet_type_id)
+    if cache.get(key):
+        return True
+    exists = CabinetTypes.objects.filter(id=cabinet_type_id).exists()
+    if exists:
+        cache.set(key, True, CABINET_TYPE_CACHE_TIMEOUT)
+    return exists
+
+
+# Baseline geometry used when a cabinet type has no GeometryRule (or omits a key)
+_BASE_W = Decimal(450)
+_BASE_D = Decimal(600)
+_BASE_H = Decimal(850)
+_BASE_CAB_SQFT = Decimal('21.0190876039')
+_BASE_DOOR_SQFT = Decimal('4.1388936981')
+DEFAULT_GEOMETRY = (_BASE_W, _BASE_D, _BASE_H, _BASE_CAB_SQFT, _BASE_DOOR_SQFT)
+
+SQFT_PLACES = Decimal('0.0001')
+
+
+def _build_geometry_params(parameters):
+    """Turn GeometryRule.parameters into (base_w, base_d, base_h, base_cabinet_sqft, base_door_sqft)"""
+    if not parameters:
+        return DEFAULT_GEOMETRY
+    p = parameters
+    return (
+        Decimal(p['base_w_mm']) if 'base_w_mm' in p else _BASE_W,
+        Decimal(p['base_d_mm']) if 'base_d_mm' in p else _BASE_D,
+        Decimal(p['base_h_mm']) if 'base_h_mm' in p else _BASE_H,
+        Decimal(p['base_cabinet_sqft']) if 'base_cabinet_sqft' in p else _BASE_CAB_SQFT,
+        Decimal(p['base_door_sqft']) if 'base_door_sqft' in p else _BASE_DOOR_SQFT,
+    )
+
+
+GEOMETRY_CACHE_VERSION_KEY = 'pricing:geometry:version'
+GEOMETRY_CACHE_TIMEOUT = 60 * 10
+
+
+def invalidate_geometry_cache():
+    """Retire every cached geometry entry by bumping the key version; called from pricing.signals.
+    Processes sharing the Redis cache see it at once; otherwise entries expire after GEOMETRY_CACHE_TIMEOUT"""
+    cache.set(GEOMETRY_CACHE_VERSION_KEY, time.time_ns(), None)
+
+
+def _load_geometry_params(cabinet_type_id):
     # Fetch active rule; implement your own parser/evaluator for formula strings
     rule = GeometryRule.objects.filter(
-        cabinet_type=cabinet_type, 
+        cabinet_type_id=cabinet_type_id, 
         is_active=True
-    ).order_by('-created_at').first()
-    
+    ).order_by('-created_at').only('parameters').first()
+    return _build_geometry_params(rule.parameters if rule else None)
+
+
+def _geometry_params(cabinet_type_id):
+    """Baseline geometry for a cabinet type, from its latest active GeometryRule (cached)"""
+    version = cache.get_or_set(GEOMETRY_CACHE_VERSION_KEY, time.time_ns(), None)
+    return cache.get_or_set(
+        f'pricing:geometry:{version}:{cabinet_type_id}',
+        lambda: _load_geometry_params(cabinet_type_id),
+        GEOMETRY_CACHE_TIMEOUT,
+    )
+
+
+def _preload_geometry_params(cabinet_type_ids):
+    """Geometry params for several cabinet types with a single query"""
+    params = {}
+    rules = GeometryRule.objects.filter(
+        cabinet_type_id__in=cabinet_type_ids,
+        is_active=True
+    ).order_by('-created_at').values_list('cabinet_type_id', 'parameters')
+    for cabinet_type_id, parameters in rules:
+        if cabinet_type_id not in params:
+            params[cabinet_type_id] = _build_geometry_params(parameters)
+    for cabinet_type_id in cabinet_type_ids:
+        params.setdefault(cabinet_type_id, DEFAULT_GEOMETRY)
+    return params
+
+
+def compute_sqft(cabinet_type_id, w, d, h, params=None):
+    """Compute cabinet and door square footage based on dimensions"""
     # Example: scale from baseline parameters if provided
-    p = (rule.parameters or {}) if rule else {}
-    base_w = Decimal(p.get('base_w_mm', 450))
-    base_d = Decimal(p.get('base_d_mm', 600))
-    base_h = Decimal(p.get('base_h_mm', 850))
-    base_cabinet_sqft = Decimal(p.get('base_cabinet_sqft', '21.0190876039'))
-    base_door_sqft = Decimal(p.get('base_door_sqft', '4.1388936981'))
+    base_w, base_d, base_h, base_cabinet_sqft, base_door_sqft = (
+        params or _geometry_params(cabinet_type_id)
+    )
     
-    w = Decimal(w)
-    d = Decimal(d)
-    h = Decimal(h)
+    scale_w = Decimal(w) / base_w
+    scale_h = Decimal(h) / base_h
     
-    scale_cab = (w/base_w) * (d/base_d) * (h/base_h)
-    scale_door = (w/base_w) * (h/base_h)
+    scale_cab = scale_w * (Decimal(d) / base_d) * scale_h
+    scale_door = scale_w * scale_h
     
-    cab_sqft = (base_cabinet_sqft * scale_cab).quantize(Decimal('0.0001'))
-    door_sqft = (base_door_sqft * scale_door).quantize(Decimal('0.0001'))
+    cab_sqft = (base_cabinet_sqft * scale_cab).quantize(SQFT_PLACES)
+    door_sqft = (base_door_sqft * scale_door).quantize(SQFT_PLACES)
     
     return cab_sqft, door_sqft
 
 
-def compute_line(line: ProjectLineItem, eff_date=None):
-    """Compute all pricing for a project line item"""
-    eff_date = eff_date or now().date()
-    
+# Fields written by compute_line / recompute_lines
+LINE_COMPUTED_FIELDS = [
+    'computed_cabinet_sqft', 'computed_door_sqft',
+    'cabinet_unit_rate', 'door_unit_rate',
+    'cabinet_material_price', 'door_price', 'standard_accessory_charge',
+    'line_total_before_tax', 'updated_at',
+]
+
+
+def _to_cents(value):
+    """Decimal amount -> integer hundredths (banker's rounding, as Decimal.quantize)"""
+    return int((Decimal(value) * 100).to_integral_value())
+
+
+def _from_cents(cents):
+    """Integer hundredths -> Decimal with two places, ready for ORM assignment"""
+    return Decimal(cents).scaleb(-2)
+
+
+def _div_round(numerator, denominator):
+    """Integer division rounded half-even, matching Decimal.quantize"""
+    quotient, remainder = divmod(numerator, denominator)
+    if 2 * remainder > denominator or (2 * remainder == denominator and quotient % 2):
+        quotient += 1
+    return quotient
+
+
+def compute_line_fields(line: ProjectLineItem, cab_rate, door_rate, base, acc_sum, geometry=None):
+    """Compute pricing fields for a line item without touching the database"""
     cab_sqft, door_sqft = compute_sqft(
-        line.cabinet_type, 
-        line.width_mm, 
-        line.depth_mm, 
-        line.height_mm
+        line.cabinet_type_id,
+        line.width_mm,
+        line.depth_mm,
+        line.height_mm,
+        params=geometry
     )
-    
-    cab_rate = _cabinet_rate(line.cabinet_material, line.project.budget_tier, eff_date)
-    door_rate = _door_rate(line.door_material, eff_date)
-    base = _brand_base(line.cabinet_type, line.project.brand.name, eff_date)
-    
-    # Update computed fields
-    line.computed_cabinet_sqft = cab_sqft
-    line.computed_door_sqft = door_sqft
-    line.cabinet_unit_rate = cab_rate
-    line.door_unit_rate = door_rate
-    
-    line.cabinet_material_price = (cab_sqft * cab_rate * line.qty).quantize(Decimal('0.01'))
-    line.door_price = (door_sqft * door_rate * line.qty).quantize(Decimal('0.01'))
-    line.standard_accessory_charge = (base * line.qty).quantize(Decimal('0.01'))
-    
+
+    # Money math in integers: sqft in 1/10000ths, rates and prices in cents
+    qty = line.qty
+    cabinet_material_cents = _div_round(int(cab_sqft.scaleb(4)) * _to_cents(cab_rate) * qty, 10000)
+    door_cents = _div_round(int(door_sqft.scaleb(4)) * _to_cents(door_rate) * qty, 10000)
+    standard_accessory_cents = _to_cents(base) * qty
+
+    line_total_cents = (
+        cabinet_material_cents +
+        door_cents +
+        standard_accessory_cents +
+        _to_cents(line.top_price) +
+        _to_cents(acc_sum)
+    )
+
+    return {
+        'computed_cabinet_sqft': cab_sqft,
+        'computed_door_sqft': door_sqft,
+        'cabinet_unit_rate': cab_rate,
+        'door_unit_rate': door_rate,
+        'cabinet_material_price': _from_cents(cabinet_material_cents),
+        'door_price': _from_cents(door_cents),
+        'standard_accessory_charge': _from_cents(standard_accessory_cents),
+        'line_total_before_tax': _from_cents(line_total_cents),
+    }
+
+
+def compute_line(line: ProjectLineItem, eff_date=None, rate_cache=None):
+    """
+    Compute all pricing for a project line item.
+    Pass rate_cache (from load_rate_cache) to share rates across several lines; otherwise
+    the rates for this line are loaded fresh, so a rate change is seen immediately.
+    """
+    eff_date = eff_date or now().date()
+
+    if rate_cache is None:
+        rate_cache = load_rate_cache(
+            line.project, eff_date,
+            material_ids={line.cabinet_material_id},
+            door_material_ids={line.door_material_id},
+            cabinet_type_ids={line.cabinet_type_id},
+        )
+    cab_rate = rate_cache['finish'].get(
+        (line.cabinet_material_id, line.project.budget_tier), Decimal('0')
+    )
+    door_rate = rate_cache['door'].get(line.door_material_id, Decimal('0'))
+    base = rate_cache['brand_charge'].get(line.cabinet_type_id, Decimal('0'))
+
     # Sum accessories linked to this line
     acc_sum = ProjectLineItemAccessory.objects.filter(
         line_item=line
     ).aggregate(s=Sum('total_price'))['s'] or Decimal('0')
-    
-    line.line_total_before_tax = (
-        line.cabinet_material_price + 
-        line.door_price + 
-        line.standard_accessory_charge + 
-        line.top_price + 
-        acc_sum
-    ).quantize(Decimal('0.01'))
-    
+
+    for field, value in compute_line_fields(line, cab_rate, door_rate, base, acc_sum).items():
+        setattr(line, field, value)
+
     line.save()
     return line
 
 
-def recompute_totals(project: Project):
-    """Recompute project totals"""
-    totals, _ = ProjectTotals.objects.get_or_create(project=project)
+def _latest_rates(qs, key_fields, value_field, eff_date):
+    """Map key tuple -> value of the latest row active on eff_date (one query)"""
+    rates = {}
+    rows = _active_on(qs, eff_date).order_by('-effective_from').values_list(
+        *key_fields, value_field
+    )
+    for *key, value in rows:
+        # Rows arrive newest first, so keep the first one seen per key
+        rates.setdefault(tuple(key), Decimal(value))
+    return rates
+
+
+def load_rate_cache(project: Project, eff_date=None, material_ids=None,
+                    door_material_ids=None, cabinet_type_ids=None):
+    """
+    Rates active on eff_date for a project's budget tier and brand, one query per table:
+    {'finish': {(material_id, tier): rate}, 'door': {material_id: rate},
+     'brand_charge': {cabinet_type_id: charge}}.
+    The *_ids arguments narrow each table to the rows a set of lines needs.
+    """
+    eff_date = eff_date or now().date()
+    tier = project.budget_tier
+
+    finish = FinishRates.objects.filter(budget_tier=tier)
+    door = DoorFinishRates.objects.all()
+    brand_charge = CabinetTypeBrandCharge.objects.filter(brand_name=project.brand.name)
+    if material_ids is not None:
+        finish = finish.filter(material_id__in=material_ids)
+    if door_material_ids is not None:
+        door = door.filter(material_id__in=door_material_ids)
+    if cabinet_type_ids is not None:
+        brand_charge = brand_charge.filter(cabinet_type_id__in=cabinet_type_ids)
+
+    return {
+        'finish': {
+            (material_id, tier): rate
+            for (material_id,), rate in _latest_rates(finish, ('material_id',), 'unit_rate', eff_date).items()
+        },
+        'door': {
+            material_id: rate
+            for (material_id,), rate in _latest_rates(door, ('material_id',), 'unit_rate', eff_date).items()
+        },
+        'brand_charge': {
+            cabinet_type_id: charge
+            for (cabinet_type_id,), charge in _latest_rates(
+                brand_charge, ('cabinet_type_id',), 'standard_accessory_charge', eff_date
+            ).items()
+        },
+    }
+
+
+LINE_BATCH_SIZE = 500
+
+
+def recompute_lines(project: Project, eff_date=None, line_ids=None):
+    """
+    Compute line items of a project in one streamed pass and persist with bulk_update.
+    Returns the subtotals of the lines written (see recompute_totals(line_sums=...)).
+    """
+    eff_date = eff_date or now().date()
+
     lines = project.lines.all()
-    
+    if line_ids is not None:
+        lines = lines.filter(id__in=line_ids)
+
+    keys = list(lines.values_list(
+        'cabinet_material_id', 'door_material_id', 'cabinet_type_id'
+    ).distinct().order_by())
+    sums = {'lines': 0, 'cabinets': Decimal('0'), 'doors': Decimal('0'),
+            'tops': Decimal('0'), 'accessories': Decimal('0')}
+    if not keys:
+        return sums
+
+    material_ids = {material_id for material_id, _, _ in keys}
+    door_material_ids = {door_material_id for _, door_material_id, _ in keys}
+    cabinet_type_ids = {cabinet_type_id for _, _, cabinet_type_id in keys}
+    tier = project.budget_tier
+
+    # Preload rate tables and accessory sums with one query each
+    rate_cache = load_rate_cache(
+        project, eff_date,
+        material_ids=material_ids,
+        door_material_ids=door_material_ids,
+        cabinet_type_ids=cabinet_type_ids,
+    )
+    cabinet_rates = rate_cache['finish']
+    door_rates = rate_cache['door']
+    brand_bases = rate_cache['brand_charge']
+    geometry = _preload_geometry_params(cabinet_type_ids)
+    acc_sums = dict(
+        ProjectLineItemAccessory.objects.filter(
+            line_item__in=lines.values('id')
+        ).values('line_item').annotate(s=Sum('total_price')).values_list('line_item', 's')
+    )
+
+    # Stream lines and flush every LINE_BATCH_SIZE so memory stays bounded on big projects
+    updated_at = now()
+    batch = []
+    written = 0
+    for line in lines.iterator(chunk_size=LINE_BATCH_SIZE):
+        fields = compute_line_fields(
+            line,
+            cabinet_rates.get((line.cabinet_material_id, tier), Decimal('0')),
+            door_rates.get(line.door_material_id, Decimal('0')),
+            brand_bases.get(line.cabinet_type_id, Decimal('0')),
+            acc_sums.get(line.id) or Decimal('0'),
+            geometry=geometry[line.cabinet_type_id],
+        )
+        for field, value in fields.items():
+            setattr(line, field, value)
+        # bulk_update bypasses save(), so auto_now is not applied
+        line.updated_at = updated_at
+        batch.append(line)
+        sums['cabinets'] += line.cabinet_material_price + line.standard_accessory_charge
+        sums['doors'] += line.door_price
+        sums['tops'] += line.top_price
+        if len(batch) >= LINE_BATCH_SIZE:
+            ProjectLineItem.objects.bulk_update(batch, LINE_COMPUTED_FIELDS)
+            written += len(batch)
+            batch = []
+
+    if batch:
+        ProjectLineItem.objects.bulk_update(batch, LINE_COMPUTED_FIELDS)
+        written += len(batch)
+
+    sums['lines'] = written
+    sums['accessories'] = sum(acc_sums.values(), Decimal('0')).quantize(Decimal('0.01'))
+    return sums
+
+
+def refresh_line_totals(line_ids):
+    """
+    Re-add line_total_before_tax in a single UPDATE for lines whose priced components are
+    already stored, e.g. after accessory edits. Only sums two-place amounts, so no rounding
+    happens in SQL; priced components still go through compute_line_fields.
+    """
     acc_sum = ProjectLineItemAccessory.objects.filter(
-        line_item__project=project
-    ).aggregate(s=Sum('total_price'))['s'] or Decimal('0')
-    
-    subtotal_cabinets = (lines.aggregate(
-        s=Sum(F('cabinet_material_price') + F('standard_accessory_charge'))
-    )['s'] or Decimal('0'))
-    
-    subtotal_doors = (lines.aggregate(s=Sum('door_price'))['s'] or Decimal('0'))
-    subtotal_tops = (lines.aggregate(s=Sum('top_price'))['s'] or Decimal('0'))
-    
-    # Update totals
-    totals.subtotal_cabinets = subtotal_cabinets
-    totals.subtotal_doors = subtotal_doors
-    totals.subtotal_accessories = acc_sum
-    totals.subtotal_tops = subtotal_tops
-    
-    subtotal = subtotal_cabinets + subtotal_doors + acc_sum + subtotal_tops
-    margin_amount = (subtotal * (project.margin_pct/Decimal('100'))).quantize(Decimal('0.01'))
-    taxable_amount = (subtotal + margin_amount).quantize(Decimal('0.01'))
-    gst_amount = (taxable_amount * (project.gst_pct/Decimal('100'))).quantize(Decimal('0.01'))
-    grand_total = (taxable_amount + gst_amount).quantize(Decimal('0.01'))
-    
-    totals.margin_amount = margin_amount
-    totals.taxable_amount = taxable_amount
-    totals.gst_amount = gst_amount
-    totals.grand_total = grand_total
-    totals.currency = project.currency
-    totals.save()
-    
-    return totals
+        line_item=OuterRef('pk')
+    ).order_by().values('line_item').annotate(s=Sum('total_price')).values('s')
+    return ProjectLineItem.objects.filter(id__in=line_ids).update(
+        line_total_before_tax=(
+            F('cabinet_material_price') +
+            F('door_price') +
+            F('standard_accessory_charge') +
+            F('top_price') +
+            Coalesce(Subquery(acc_sum), Value(Decimal('0')), output_field=DecimalField(max_digits=12, decimal_places=2))
+        ),
+        updated_at=now(),
+    )
+
+
+def totals_values(project: Project, subtotal_cabinets, subtotal_doors, subtotal_tops, acc_sum):
+    """ProjectTotals field values from the project's subtotals (margin and GST in integer cents)"""
+    # Percentages as hundredths of a percent, amounts in cents
+    subtotal = _to_cents(subtotal_cabinets + subtotal_doors + acc_sum + subtotal_tops)
+    margin_cents = _div_round(subtotal * _to_cents(project.margin_pct), 10000)
+    taxable_cents = subtotal + margin_cents
+    gst_cents = _div_round(taxable_cents * _to_cents(project.gst_pct), 10000)
+    
+    return {
+        'subtotal_cabinets': subtotal_cabinets,
+        'subtotal_doors': subtotal_doors,
+        'subtotal_accessories': acc_sum,
+        'subtotal_tops': subtotal_tops,
+        'margin_amount': _from_cents(margin_cents),
+        'taxable_amount': _from_cents(taxable_cents),
+        'gst_amount': _from_cents(gst_cents),
+        'grand_total': _from_cents(taxable_cents + gst_cents),
+        'currency': project.currency,
+    }
+
+
+def _subtotal(queryset, expression):
+    """Correlated per-project SUM for annotate(); 0 when the project has no rows"""
+    total = queryset.order_by().values('project_ref').annotate(s=Sum(expression)).values('s')
+    return Coalesce(Subquery(total), Value(Decimal('0')), output_field=DecimalField(max_digits=12, decimal_places=2))
+
+
+def live_project_totals(projects):
+    """
+    Unsaved ProjectTotals computed from current line/accessory rows in one SELECT
+    (one correlated subtotal per column), for reads that must not wait on recompute_totals.
+    """
+    lines = ProjectLineItem.objects.filter(project=OuterRef('pk')).annotate(project_ref=F('project_id'))
+    accessories = ProjectLineItemAccessory.objects.filter(
+        line_item__project=OuterRef('pk')
+    ).annotate(project_ref=F('line_item__project_id'))
+    projects = projects.annotate(
+        live_cabinets=_subtotal(lines, F('cabinet_material_price') + F('standard_accessory_charge')),
+        live_doors=_subtotal(lines, 'door_price'),
+        live_tops=_subtotal(lines, 'top_price'),
+        live_accessories=_subtotal(accessories, 'total_price'),
+    )
+    return [
+        ProjectTotals(project=project, **totals_values(
+            project, project.live_cabinets, project.live_doors, project.live_tops,
+            project.live_accessories.quantize(Decimal('0.01'))
+        ))
+        for project in projects
+    ]
+
+
+def recompute_totals(project: Project, line_sums=None):
+    """
+    Recompute project totals; returns the number of ProjectTotals rows written.
+    Pass `line_sums` from a full-project recompute_lines() to skip re-aggregating lines.
+    """
+    if line_sums is not None:
+        subtotal_cabinets = line_sums['cabinets']
+        subtotal_doors = line_sums['doors']
+        subtotal_tops = line_sums['tops']
+        acc_sum = line_sums['accessories']
+    else:
+        agg = project.lines.aggregate(
+            cabs=Sum(F('cabinet_material_price') + F('standard_accessory_charge')),
+            doors=Sum('door_price'),
+            tops=Sum('top_price'),
+        )
+        acc_sum = ProjectLineItemAccessory.objects.filter(
+            line_item__project=project
+        ).aggregate(s=Sum('total_price'))['s'] or Decimal('0')
+        
+        subtotal_cabinets = agg['cabs'] or Decimal('0')
+        subtotal_doors = agg['doors'] or Decimal('0')
+        subtotal_tops = agg['tops'] or Decimal('0')
+    
+    values = totals_values(project, subtotal_cabinets, subtotal_doors, subtotal_tops, acc_sum)
+    
+    # Update in place; only the first recompute of a project has to create the row
+    updated = ProjectTotals.objects.filter(project=project).update(updated_at=now(), **values)
+    if not updated:
+        ProjectTotals.objects.update_or_create(project=project, defaults=values)
+        updated = 1
+    return updated
+
+
+def enqueue_on_commit(task, *args):
+    """Schedule a Celery task to run once the current transaction commits; returns its id"""
+    task_id = str(uuid.uuid4())
+    transaction.on_commit(lambda: task.apply_async(args=args, task_id=task_id))
+    return task_id
+
+
+# Delay before a queued lighting totals refresh runs, so a burst of item edits shares it
+LIGHTING_TOTALS_COUNTDOWN = 2
+LIGHTING_TOTALS_LOCK_TIMEOUT = 60
+
+
+def queue_lighting_totals(project, sync=False):
+    """
+    Refresh a project's lighting totals once the current transaction commits, debounced
+    per project through a lock in the shared cache (the worker releases it, see
+    settings.CACHES). Pass sync=True to recompute inline instead.
+    """
+    if sync:
+        calculate_project_lighting_totals(project)
+        return
+    project_id = project.pk
+    
+    def enqueue():
+        lock_key = lighting_totals_lock_key(project_id)
+        if not cache.add(lock_key, True, LIGHTING_TOTALS_LOCK_TIMEOUT):
+            return
+        try:
+            refresh_lighting_totals.apply_async(args=[project_id], countdown=LIGHTING_TOTALS_COUNTDOWN)
+        except Exception:
+            # Nothing will release the lock, so don't let it swallow the next edits
+            cache.delete(lock_key)
+            raise
+    transaction.on_commit(enqueue)
+
+
+_dirty = threading.local()
+
+
+def _mark_line_dirty(line_item: ProjectLineItem):
+    """
+    Queue a line (and its project) for recompute once the current transaction commits.
+    Repeated writes to the same line or project within a transaction collapse to one recompute.
+    """
+    dirty_lines = getattr(_dirty, 'lines', None)
+    if dirty_lines is None:
+        dirty_lines = _dirty.lines = {}
+    dirty_lines.setdefault(line_item.project_id, set()).add(line_item.pk)
+    # Registered on every call so a rolled-back transaction never strands the queue;
+    # after the first flush the remaining callbacks find nothing to do.
+    transaction.on_commit(_flush_dirty)
+
+
+def _flush_dirty():
+    """Refresh queued line totals per project in one statement, then project totals once"""
+    dirty_lines = getattr(_dirty, 'lines', None)
+    if not dirty_lines:
+        return
+    _dirty.lines = {}
+
+    projects = Project.objects.in_bulk(dirty_lines.keys())
+    for project_id, line_ids in dirty_lines.items():
+        project = projects.get(project_id)
+        if project is None:
+            continue
+        with transaction.atomic():
+            # Accessory edits leave cabinet/door/base pricing untouched; only re-add totals
+            refresh_line_totals(line_ids)
+            recompute_totals(project)
+
+
+REORDER_BATCH_SIZE = 500
+
+
+def _bulk_reorder(queryset, orders, touch=False):
+    """
+    Apply [{'id': .., 'sort_order': ..}, ...] to rows of queryset in a single UPDATE.
+    Ids outside queryset are ignored, so the filter doubles as the ownership check.
+    """
+    mapping = {
+        int(order['id']): int(order['sort_order'])
+        for order in orders
+        if order.get('id') and order.get('sort_order') is not None
+    }
+    if not mapping:
+        return 0
+    fields = ['sort_order', 'updated_at'] if touch else ['sort_order']
+    objs = list(queryset.filter(id__in=mapping).only('id'))
+    stamp = now()
+    for obj in objs:
+        obj.sort_order = mapping[obj.id]
+        if touch:
+            obj.updated_at = stamp
+    return queryset.model.objects.bulk_update(objs, fields, batch_size=REORDER_BATCH_SIZE)
+
+
+def _accessory_pricing(data):
+    """
+    Pricing fields for a new accessory, so the row is written once.
+    Mirrors ProjectLineItemAccessory.save: unit price defaults from the product variant.
+    """
+    pricing = {}
+    if not data.get('unit_price'):
+        variant = data['product_variant']
+        pricing['unit_price'] = variant.company_price
+        pricing['tax_rate_snapshot'] = getattr(
+            variant, 'tax_rate', data.get('tax_rate_snapshot', Decimal('18.00'))
+        )
+    unit_price = pricing.get('unit_price', data.get('unit_price'))
+    pricing['total_price'] = (unit_price * data.get('qty', 1)).quantize(Decimal('0.01'))
+    return pricing
+
+
+PLAN_UPLOAD_WORKERS = 4
+PLAN_UPLOAD_BATCH_SIZE = 100
+PLAN_IMAGE_MAX_BYTES = 20 * 1024 * 1024
+
+
+def _check_plan_upload(file, caption):
+    """
+    Cheap per-file checks for bulk_upload, in place of a full serializer per file.
+    Returns serializer-style errors ({field: [messages]}), empty when the file is acceptable.
+    """
+    errors = {}
+    image_errors = []
+    try:
+        validate_image_file_extension(file)
+    except DjangoValidationError as e:
+        image_errors.extend(e.messages)
+    content_type = getattr(file, 'content_type', '') or ''
+    if content_type and not content_type.startswith('image/'):
+        image_errors.append(f'Unsupported file type: {content_type}.')
+    if not file.size:
+        image_errors.append('The submitted file is empty.')
+    elif file.size > PLAN_IMAGE_MAX_BYTES:
+        image_errors.append(f'File exceeds the {PLAN_IMAGE_MAX_BYTES // (1024 * 1024)} MB limit.')
+    if image_errors:
+        errors['image'] = image_errors
+
+    max_caption = ProjectPlanImage._meta.get_field('caption').max_length
+    if len(caption) > max_caption:
+        errors['caption'] = [f'Ensure this field has no more than {max_caption} characters.']
+    return errors
+
+
+def _verify_plan_image(file):
+    """Decode-check an upload with Pillow, as ImageField validation would; raises ValidationError"""
+    try:
+        with Image.open(file) as image:
+            image.verify()
+    except Exception:
+        raise DjangoValidationError(
+            'Upload a valid image. The file you uploaded was either not an image or a corrupted image.'
+        )
+    finally:
+        file.seek(0)
+
+
+def _store_plan_image(image_group, file):
+    """Verify one uploaded plan image and write it to storage; returns the stored name"""
+    _verify_plan_image(file)
+    field = ProjectPlanImage._meta.get_field('image')
+    name = field.generate_filename(ProjectPlanImage(image_group=image_group), file.name)
+    return field.storage.save(name, file, max_length=field.max_length)
+
+
+def _caption_from_filename(name):
+    """Default caption for an image, mirroring ProjectPlanImage.save"""
+    return os.path.splitext(os.path.basename(name))[0].replace('_', ' ').title()
+
+
+def _relations_for_serializer(model, serializer, prefix, select, prefetch):
+    """Collect select_related/prefetch_related paths reached by serializer's field sources"""
+    for field in serializer.fields.values():
+        if field.source == '*' or getattr(field, 'write_only', False):
+            continue
+        nested = getattr(field, 'child', None) if isinstance(field, serializers.ListSerializer) else field
+        current, path, many = model, prefix, False
+        for attr in field.source.split('.'):
+            try:
+                model_field = current._meta.get_field(attr)
+            except FieldDoesNotExist:
+                break  # property/method: nothing further to load
+            if not model_field.is_relation:
+                break
+            path = f'{path}__{attr}' if path else attr
+            many = many or model_field.many_to_many or model_field.one_to_many
+            (prefetch if many else select).add(path)
+            current = model_field.related_model
+        else:
+            if isinstance(nested, serializers.BaseSerializer) and path != prefix:
+                _relations_for_serializer(current, nested, path, select, prefetch)
+
+
+def auto_prefetch(queryset, serializer_class, prefetch_querysets=None):
+    """
+    Apply the select_related/prefetch_related a serializer will walk, so querysets
+    can't drift out of sync with serializer fields. prefetch_querysets maps a
+    prefetch path to a custom queryset (e.g. one narrowed with only()).
+    """
+    select, prefetch = set(), set()
+    _relations_for_serializer(queryset.model, serializer_class(), '', select, prefetch)
+    # Paths under a prefetched relation are resolved by the prefetch, not a join
+    select = {path for path in select if not any(path.startswith(f'{p}__') for p in prefetch)}
+    prefetch_querysets = prefetch_querysets or {}
+    lookups = [
+        Prefetch(path, queryset=prefetch_querysets[path]) if path in prefetch_querysets else path
+        for path in sorted(prefetch)
+    ]
+    if select:
+        queryset = queryset.select_related(*sorted(select))
+    return queryset.prefetch_related(*lookups)
+
+
+PRODUCT_SEARCH_CONFIG = 'english'
+
+
+def search_variants(variants, search):
+    """
+    Narrow a ProductVariant queryset by free text.
+    On PostgreSQL product name/description go through full-text search ranked by relevance
+    (GIN expression index from catalog 0015); code/colour/name substrings stay as icontains,
+    which the UPPER(...) gin_trgm_ops indexes serve. Other backends fall back to icontains.
+    """
+    if connection.vendor != 'postgresql':
+        return variants.filter(
+            Q(product__name__icontains=search) |
+            Q(color_name__icontains=search) |
+            Q(material_code__icontains=search) |
+            Q(product__description__icontains=search)
+        )
+
+    from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+    vector = SearchVector('product__name', 'product__description', config=PRODUCT_SEARCH_CONFIG)
+    query = SearchQuery(search, config=PRODUCT_SEARCH_CONFIG, search_type='websearch')
+    return variants.annotate(
+        search_rank=SearchRank(vector, query)
+    ).filter(
+        Q(search_rank__gt=0) |
+        Q(product__name__icontains=search) |
+        Q(color_name__icontains=search) |
+        Q(material_code__icontains=search)
+    ).order_by('-search_rank', 'product__name', 'material_code')
+
+
+class ProjectSearchFilter(filters.SearchFilter):
+    """
+    ?search= over Project.search_text (customer name, status, brand name) instead of
+    icontains across joined customer/brand rows. Every term must match, as with SearchFilter.
+    """
+    def filter_queryset(self, request, queryset, view):
+        for term in self.get_search_terms(request):
+            queryset = queryset.filter(search_text__icontains=term)
+        return queryset
+
+
+class AvailableProductsPagination(CursorPagination):
+    """
+    Keyset pagination for the accessory picker: constant cost at any depth and no COUNT(*).
+    Only used when the client asks for it (cursor or page_size), so existing callers
+    keep receiving a plain list.
+    """
+    ordering = 'id'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_ordering(self, request, queryset, view):
+        # Always key on the primary key, ignoring the viewset's default ordering
+        return (self.ordering,)
 
 
 # =========================
@@ -186,11 +864,25 @@ def recompute_totals(project: Project):
 
 class BaseModelViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticatedOrReadOnly]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['id']
     ordering_fields = ['id', 'created_at', 'updated_at']
     ordering = ['-created_at']
 
+    def get_object(self):
+        """
+        Memoized for the lifetime of the request, keyed by (model, lookup value), so
+        actions and helpers that resolve the same object again reuse the loaded instance.
+        """
+        lookup = self.kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        orm_cache = getattr(self.request, '_orm_cache', None)
+        if orm_cache is None:
+            orm_cache = self.request._orm_cache = {}
+        key = (self.get_queryset().model, str(lookup))
+        if key not in orm_cache:
+            orm_cache[key] = super().get_object()
+        return orm_cache[key]
+
 
 # =========================
 # Masters & Rates ViewSets
@@ -213,16 +905,6 @@ class FinishRatesViewSet(BaseModelViewSet):
     serializer_class = FinishRatesSerializer
     search_fields = ['material__name', 'budget_tier']
     ordering_fields = ['unit_rate', 'effective_from', 'effective_to']
-    
-    def perform_create(self, serializer):
-        eff_from = serializer.validated_data.get('effective_from')
-        eff_to = serializer.validated_data.get('effective_to')
-        if eff_to and eff_to < eff_from:
-            raise ValueError('effective_to must be >= effective_from')
-        serializer.save()
-    
-    def perform_update(self, serializer):
-        self.perform_create(serializer)
 
 
 class DoorFinishRatesViewSet(BaseModelViewSet):
@@ -230,16 +912,6 @@ class DoorFinishRatesViewSet(BaseModelViewSet):
     serializer_class = DoorFinishRatesSerializer
     search_fields = ['material__name']
     ordering_fields = ['unit_rate', 'effective_from', 'effective_to']
-    
-    def perform_create(self, serializer):
-        eff_from = serializer.validated_data.get('effective_from')
-        eff_to = serializer.validated_data.get('effective_to')
-        if eff_to and eff_to < eff_from:
-            raise ValueError('effective_to must be >= effective_from')
-        serializer.save()
-    
-    def perform_update(self, serializer):
-        self.perform_create(serializer)
 
 
 class CabinetTypesViewSet(BaseModelViewSet):
@@ -253,16 +925,6 @@ class CabinetTypeBrandChargeViewSet(BaseModelViewSet):
     serializer_class = CabinetTypeBrandChargeSerializer
     search_fields = ['cabinet_type__name', 'brand_name']
     ordering_fields = ['standard_accessory_charge', 'effective_from', 'effective_to']
-    
-    def perform_create(self, serializer):
-        eff_from = serializer.validated_data.get('effective_from')
-        eff_to = serializer.validated_data.get('effective_to')
-        if eff_to and eff_to < eff_from:
-            raise ValueError('effective_to must be >= effective_from')
-        serializer.save()
-    
-    def perform_update(self, serializer):
-        self.perform_create(serializer)
 
 
 class AccessoriesViewSet(BaseModelViewSet):
@@ -297,27 +959,53 @@ class GeometryRuleViewSet(BaseModelViewSet):
 class ProjectViewSet(BaseModelViewSet):
     queryset = Project.objects.all().select_related('customer', 'brand')
     serializer_class = ProjectSerializer
+    filter_backends = [DjangoFilterBackend, ProjectSearchFilter, filters.OrderingFilter]
+    # Folded into Project.search_text; ProjectSearchFilter searches that column
     search_fields = ['customer__name', 'status', 'brand__name']
     
     @action(detail=True, methods=['post'])
     def recalc(self, request, pk=None):
-        """Recalculate all line items and project totals"""
+        """Queue recalculation of all line items and project totals; poll recalc_status"""
         project = self.get_object()
-        with transaction.atomic():
-            for line in project.lines.all():
-                compute_line(line)
-            totals = recompute_totals(project)
-        data = ProjectTotalsSerializer(totals).data
-        return Response(data, status=status.HTTP_200_OK)
+        task_id = enqueue_on_commit(recalc_project, project.id)
+        
+        return Response({
+            'message': 'Recalculation queued',
+            'task_id': task_id
+        }, status=status.HTTP_202_ACCEPTED)
+    
+    @action(detail=True, methods=['get'])
+    def recalc_status(self, request, pk=None):
+        """State of a queued recalculation, with the project's totals once it has finished"""
+        task_id = request.query_params.get('task_id')
+        if not task_id:
+            return Response(
+                {'error': 'task_id is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if settings.CELERY_TASK_ALWAYS_EAGER:
+            # Eager (local) setups ran the task before the 202 was sent
+            task_status = 'SUCCESS'
+        else:
+            result = AsyncResult(task_id)
+            # Without a result backend the state can't be known, so never report it finished
+            task_status = 'UNKNOWN' if isinstance(result.backend, DisabledBackend) else result.status
+        
+        data = {'task_id': task_id, 'status': task_status}
+        if task_status == 'SUCCESS':
+            totals = ProjectTotals.objects.filter(project_id=pk).first()
+            data['totals'] = ProjectTotalsSerializer(totals).data if totals else None
+        return Response(data)
+    
     @action(detail=True, methods=['get', 'post'])
     def lighting(self, request, pk=None):
         """Get or manage project lighting configuration"""
         project = self.get_object()
         
         if request.method == 'GET':
-            config, created = ProjectLightingConfiguration.objects.get_or_create(
-                project=project,
-                defaults={'work_top_length_mm': 6000}
+            config = ProjectLightingConfiguration.objects.ensure(
+                project, ProjectLightingConfiguration.DEFAULTS
             )
             
             serializer = ProjectLightingConfigurationSerializer(config)
@@ -325,9 +1013,8 @@ class ProjectViewSet(BaseModelViewSet):
             
         elif request.method == 'POST':
             # Auto-create lighting items and return configuration
-            config, created = ProjectLightingConfiguration.objects.get_or_create(
-                project=project,
-                defaults={'work_top_length_mm': 6000}
+            config = ProjectLightingConfiguration.objects.ensure(
+                project, ProjectLightingConfiguration.DEFAULTS
             )
             
             created_items = auto_create_lighting_items_for_project(project)
@@ -343,35 +1030,25 @@ class ProjectViewSet(BaseModelViewSet):
     def recalculate_lighting(self, request, pk=None):
         """Recalculate all lighting costs for project"""
         project = self.get_object()
+        task_id = enqueue_on_commit(recalc_project_lighting, project.id)
         
-        with transaction.atomic():
-            config = calculate_project_lighting_totals(project)
-            
-            # Also recalculate project totals to include lighting
-            recalculate_project_totals(project.id)
-            
         return Response({
-            'message': 'Lighting costs recalculated',
-            'grand_total_lighting_cost': config.grand_total_lighting_cost
-        })
+            'message': 'Lighting recalculation queued',
+            'task_id': task_id
+        }, status=status.HTTP_202_ACCEPTED)
 
 
 class ProjectLineItemViewSet(BaseModelViewSet):
     queryset = ProjectLineItem.objects.all().select_related(
-        'project', 'cabinet_type', 'cabinet_material', 'door_material'
+        # project__brand: compute_line reads the brand name for the base charge
+        'project', 'project__brand', 'cabinet_type', 'cabinet_material', 'door_material'
     ).prefetch_related('extra_accessories')
     serializer_class = ProjectLineItemSerializer
+    filterset_class = ProjectLineItemFilter
     search_fields = ['project__customer__name', 'cabinet_type__name', 'scope']
     ordering_fields = ['line_total_before_tax', 'created_at', 'updated_at']
     
     # ADD THIS METHOD:
-    def get_queryset(self):
-        """Filter line items by project if provided"""
-        project_id = self.request.query_params.get('project')
-        if project_id:
-            return self.queryset.filter(project=project_id)
-        return self.queryset
-    
     def perform_create(self, serializer):
         line = serializer.save()
         compute_line(line)
@@ -394,6 +1071,7 @@ class ProjectLineItemAccessoryViewSet(BaseModelViewSet):
     ).prefetch_related('product_variant__images')
     
     serializer_class = ProjectLineItemAccessorySerializer
+    filterset_class = ProjectLineItemAccessoryFilter
     search_fields = [
         'product_variant__product__name', 
         'product_variant__color_name',
@@ -402,46 +1080,55 @@ class ProjectLineItemAccessoryViewSet(BaseModelViewSet):
     ]
     ordering_fields = ['total_price', 'created_at', 'updated_at']
     
+    def get_serializer_class(self):
+        """Use a thin serializer for list view to optimize performance"""
+        if self.action == 'list':
+            return ProjectLineItemAccessoryListSerializer
+        return ProjectLineItemAccessorySerializer
+    
     def get_queryset(self):
-        """Filter accessories by project or line item"""
-        queryset = self.queryset
-        
-        project_id = self.request.query_params.get('project')
-        line_item_id = self.request.query_params.get('line_item')
-        category = self.request.query_params.get('category')
-        
-        if project_id:
-            queryset = queryset.filter(line_item__project=project_id)
-        
-        if line_item_id:
-            queryset = queryset.filter(line_item=line_item_id)
-            
-        if category:
-            queryset = queryset.filter(product_variant__product__category__name__icontains=category)
-            
-        return queryset
+        """Slim queryset for list responses; filtering is handled by ProjectLineItemAccessoryFilter"""
+        if self.action == 'list':
+            # Only the columns the list serializer renders
+            return ProjectLineItemAccessory.objects.select_related(
+                'product_variant__product__brand'
+            ).only(*ProjectLineItemAccessoryListSerializer.ONLY_FIELDS)
+        return self.queryset
     
     @action(detail=False, methods=['get'])
     def available_products(self, request):
         """Get available product variants for accessories"""
-        from catalog.models import ProductVariant
-        from catalog.serializers import ProductVariantSerializer
+        from catalog.models import ProductVariant, ProductImage
         
         # Get query parameters
+        category_id = request.query_params.get('category_id')
         category_name = request.query_params.get('category', 'ACCESSORIES')
         search = request.query_params.get('search', '')
         brand_id = request.query_params.get('brand')
         
-        # Base queryset - active product variants
+        # Base queryset - active product variants, narrowed to the columns the picker renders
         variants = ProductVariant.objects.filter(
             is_active=True,
             product__is_active=True
-        ).select_related(
-            'product', 'product__category', 'product__brand'
-        ).prefetch_related('images')
+        )
+        variants = auto_prefetch(
+            variants,
+            AvailableProductVariantSerializer,
+            prefetch_querysets={
+                'images': ProductImage.objects.only(
+                    'id', 'product_variant_id', 'image', 'is_primary', 'sort_order'
+                ).order_by('sort_order', 'id')
+            }
+        ).only(*AvailableProductVariantSerializer.ONLY_FIELDS)
         
-        # Filter by category
-        if category_name:
+        # Filter by category: indexed FK equality when the id is known, name match otherwise
+        if category_id:
+            if not category_id.isdigit():
+                return Response({'category_id': ['Enter a number.']}, status=status.HTTP_400_BAD_REQUEST)
+            variants = variants.filter(product__category_id=category_id)
+        elif category_name:
+            if 'category' in request.query_params:
+                warn_category_name_filter()
             variants = variants.filter(
                 product__category__name__icontains=category_name
             )
@@ -452,79 +1139,153 @@ class ProjectLineItemAccessoryViewSet(BaseModelViewSet):
         
         # Search filter
         if search:
-            variants = variants.filter(
-                Q(product__name__icontains=search) |
-                Q(color_name__icontains=search) |
-                Q(material_code__icontains=search) |
-                Q(product__description__icontains=search)
-            )
+            variants = search_variants(variants, search)
         
-        # Pagination
-        page = self.paginate_queryset(variants)
+        # Pagination (opt-in keyset cursor; plain list otherwise)
+        paginator = AvailableProductsPagination()
+        page = paginator.paginate_queryset(variants, request, view=self)
         if page is not None:
-            serializer = ProductVariantSerializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+            serializer = AvailableProductVariantSerializer(page, many=True, context={'request': request})
+            return paginator.get_paginated_response(serializer.data)
         
-        serializer = ProductVariantSerializer(variants, many=True)
+        serializer = AvailableProductVariantSerializer(variants, many=True, context={'request': request})
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
     def categories(self, request):
-        """Get available categories for filtering"""
+        """Get available categories for filtering; ?q= returns matching (id, name) pairs for autocomplete"""
         from catalog.models import Category
         from catalog.serializers import CategorySerializer
         
-        categories = Category.objects.filter(
-            is_active=True,
-            product__variants__is_active=True
-        ).distinct()
+        payload = cache.get(ACCESSORY_CATEGORIES_CACHE_KEY)
+        if payload is None:
+            categories = Category.objects.filter(
+                is_active=True,
+                product__variants__is_active=True
+            ).distinct()
+            payload = CategorySerializer(categories, many=True).data
+            cache.set(ACCESSORY_CATEGORIES_CACHE_KEY, payload, ACCESSORY_CATEGORIES_CACHE_TIMEOUT)
         
-        serializer = CategorySerializer(categories, many=True)
-        return Response(serializer.data)
+        q = request.query_params.get('q', '').strip().lower()
+        if q:
+            # Filter the cached list rather than querying; it is small and already in memory
+            return Response([
+                {'id': category['id'], 'name': category['name']}
+                for category in payload
+                if q in category['name'].lower()
+            ])
+        return Response(payload)
     
     def perform_create(self, serializer):
         """Create accessory and recalculate totals"""
-        accessory = serializer.save()
-        
-        # Auto-populate pricing from product variant if not provided
-        if not accessory.unit_price:
-            accessory.unit_price = accessory.product_variant.company_price
-            accessory.tax_rate_snapshot = accessory.product_variant.tax_rate
-            accessory.save()
+        accessory = serializer.save(**_accessory_pricing(serializer.validated_data))
         
         # Recalculate line item and project totals
-        compute_line(accessory.line_item)
-        recompute_totals(accessory.line_item.project)
+        _mark_line_dirty(accessory.line_item)
+    
+    def create(self, request, *args, **kwargs):
+        """Create one accessory, or a list of them in a single insert with one recompute per line"""
+        if not isinstance(request.data, list):
+            return super().create(request, *args, **kwargs)
+        
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        
+        with transaction.atomic():
+            accessories = ProjectLineItemAccessory.objects.bulk_create([
+                ProjectLineItemAccessory(**{**data, **_accessory_pricing(data)})
+                for data in serializer.validated_data
+            ])
+            # Recomputes are queued until commit, so each touched line/project is refreshed once
+            for accessory in accessories:
+                _mark_line_dirty(accessory.line_item)
+        
+        created = ProjectLineItemAccessory.objects.filter(
+            pk__in=[accessory.pk for accessory in accessories]
+        ).select_related(
+            'product_variant__product__brand'
+        ).only(*ProjectLineItemAccessoryListSerializer.ONLY_FIELDS)
+        data = ProjectLineItemAccessoryListSerializer(
+            created, many=True, context=self.get_serializer_context()
+        ).data
+        return Response(data, status=status.HTTP_201_CREATED)
     
     def perform_update(self, serializer):
         """Update accessory and recalculate totals"""
         accessory = serializer.save()
-        compute_line(accessory.line_item)
-        recompute_totals(accessory.line_item.project)
+        _mark_line_dirty(accessory.line_item)
     
     def perform_destroy(self, instance):
         """Delete accessory and recalculate totals"""
         line_item = instance.line_item
-        project = line_item.project
         super().perform_destroy(instance)
-        compute_line(line_item)
-        recompute_totals(project)
-
-class ProjectTotalsViewSet(BaseModelViewSet):
+        _mark_line_dirty(line_item)
+
+class CachedReadMixin:
+    """
+    Cache list/retrieve responses. The key combines the full request URL with the
+    latest updated_at and row count of the rows being served (for retrieve, the
+    object's own updated_at), so any write that touches updated_at (save(), or
+    update()/bulk_update() that set it) or adds/removes a row produces a fresh key
+    without explicit invalidation.
+    """
+    cache_timeout = 60 * 5
+
+    def _response_cache_key(self, request, queryset):
+        stamp = queryset.order_by().aggregate(latest=Max('updated_at'), rows=Count('id'))
+        latest = stamp['latest'].isoformat() if stamp['latest'] else ''
+        return f"pricing:response:{self.basename}:{request.build_absolute_uri()}:{latest}:{stamp['rows']}"
+
+    def _cached_response(self, request, queryset, render, *args, **kwargs):
+        key = self._response_cache_key(request, queryset)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+        response = render(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, self.cache_timeout)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self._cached_response(request, queryset, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        # get_object() applies the usual 404/permission handling; the object's own
+        # updated_at then versions the key without a separate aggregate query
+        instance = self.get_object()
+        key = f"pricing:response:{self.basename}:{request.build_absolute_uri()}:{instance.updated_at.isoformat()}"
+        data = cache.get(key)
+        if data is None:
+            data = self.get_serializer(instance).data
+            cache.set(key, data, self.cache_timeout)
+        return Response(data)
+
+
+class ProjectTotalsViewSet(CachedReadMixin, BaseModelViewSet):
     queryset = ProjectTotals.objects.all().select_related('project')
     serializer_class = ProjectTotalsSerializer
+    filterset_class = ProjectTotalsFilter
     http_method_names = ['get', 'head', 'options']  # Read-only
 
-    def get_queryset(self):
-        """Filter totals by project if provided"""
-        project_id = self.request.query_params.get('project')
+    def list(self, request, *args, **kwargs):
+        """With PRICING_LIVE_TOTALS, compute totals from current rows instead of the stored table"""
+        if not settings.PRICING_LIVE_TOTALS:
+            return super().list(request, *args, **kwargs)
+        projects = Project.objects.order_by('-created_at')
+        project_id = request.query_params.get('project')
         if project_id:
-            return self.queryset.filter(project=project_id)
-        return self.queryset
+            if not project_id.isdigit():
+                return Response({'project': ['Enter a number.']}, status=status.HTTP_400_BAD_REQUEST)
+            projects = projects.filter(pk=project_id)
+        serializer = self.get_serializer(live_project_totals(projects), many=True)
+        return Response(serializer.data)
+
 
 class ProjectPlanImageGroupViewSet(BaseModelViewSet):
     queryset = ProjectPlanImageGroup.objects.all().prefetch_related('images')
     serializer_class = ProjectPlanImageGroupSerializer
+    filterset_class = ProjectPlanImageGroupFilter
     search_fields = ['title', 'description', 'project__customer__name']
     ordering_fields = ['sort_order', 'created_at', 'updated_at']
     
@@ -534,13 +1295,6 @@ class ProjectPlanImageGroupViewSet(BaseModelViewSet):
             return ProjectPlanImageGroupListSerializer
         return ProjectPlanImageGroupSerializer
     
-    def get_queryset(self):
-        """Filter groups by project if provided"""
-        project_id = self.request.query_params.get('project')
-        if project_id:
-            return self.queryset.filter(project=project_id)
-        return self.queryset
-    
     @action(detail=True, methods=['post'])
     def reorder_images(self, request, pk=None):
         """Reorder images within a group"""
@@ -549,15 +1303,11 @@ class ProjectPlanImageGroupViewSet(BaseModelViewSet):
         
         try:
             with transaction.atomic():
-                for order_data in image_orders:
-                    image_id = order_data.get('id')
-                    new_order = order_data.get('sort_order')
-                    
-                    if image_id and new_order is not None:
-                        ProjectPlanImage.objects.filter(
-                            id=image_id,
-                            image_group=group
-                        ).update(sort_order=new_order)
+                _bulk_reorder(
+                    ProjectPlanImage.objects.filter(image_group=group),
+                    image_orders,
+                    touch=True
+                )
                 
                 return Response({'message': 'Images reordered successfully'})
         except Exception as e:
@@ -580,15 +1330,10 @@ class ProjectPlanImageGroupViewSet(BaseModelViewSet):
         
         try:
             with transaction.atomic():
-                for order_data in group_orders:
-                    group_id = order_data.get('id')
-                    new_order = order_data.get('sort_order')
-                    
-                    if group_id and new_order is not None:
-                        ProjectPlanImageGroup.objects.filter(
-                            id=group_id,
-                            project=project_id
-                        ).update(sort_order=new_order)
+                _bulk_reorder(
+                    ProjectPlanImageGroup.objects.filter(project=project_id),
+                    group_orders
+                )
                 
                 return Response({'message': 'Groups reordered successfully'})
         except Exception as e:
@@ -597,28 +1342,14 @@ class ProjectPlanImageGroupViewSet(BaseModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-class ProjectPlanImageViewSet(BaseModelViewSet):
+class ProjectPlanImageViewSet(CachedReadMixin, BaseModelViewSet):
     queryset = ProjectPlanImage.objects.all().select_related('image_group', 'image_group__project')
     serializer_class = ProjectPlanImageSerializer
+    filterset_class = ProjectPlanImageFilter
     parser_classes = [MultiPartParser, FormParser]  # Support file uploads
     search_fields = ['caption', 'image_group__title', 'image_group__project__customer__name']
     ordering_fields = ['sort_order', 'created_at', 'updated_at']
     
-    def get_queryset(self):
-        """Filter images by group or project"""
-        queryset = self.queryset
-        
-        project_id = self.request.query_params.get('project')
-        group_id = self.request.query_params.get('image_group')
-        
-        if project_id:
-            queryset = queryset.filter(image_group__project=project_id)
-        
-        if group_id:
-            queryset = queryset.filter(image_group=group_id)
-            
-        return queryset
-    
     @action(detail=False, methods=['post'])
     def bulk_upload(self, request):
         """Upload multiple images to a group at once"""
@@ -631,63 +1362,88 @@ class ProjectPlanImageViewSet(BaseModelViewSet):
             )
         
         try:
-            image_group = get_object_or_404(ProjectPlanImageGroup, id=image_group_id)
+            # project is loaded here so upload workers never touch the database
+            image_group = get_object_or_404(
+                ProjectPlanImageGroup.objects.select_related('project'), id=image_group_id
+            )
         except:
             return Response(
                 {'error': 'Image group not found'}, 
                 status=status.HTTP_404
             )
         
-        uploaded_images = []
         errors = []
         
         # Handle multiple file upload
         files = request.FILES.getlist('images')
         captions = request.POST.getlist('captions')
         
-        try:
-            with transaction.atomic():
-                for i, file in enumerate(files):
+        # Validate every file up front so a bad file is reported without touching storage
+        pending = []
+        for i, file in enumerate(files):
+            caption = (captions[i] if i < len(captions) else '').strip()
+            file_errors = _check_plan_upload(file, caption)
+            if file_errors:
+                errors.append({
+                    'file': file.name,
+                    'errors': file_errors
+                })
+            else:
+                pending.append((file, caption))
+        
+        # Decoding (CPU, Pillow releases the GIL) and storage writes (I/O) are independent
+        # per file; run them on the pool and keep the database work on this thread
+        stored = []
+        if pending:
+            with ThreadPoolExecutor(max_workers=min(len(pending), PLAN_UPLOAD_WORKERS)) as pool:
+                futures = [
+                    (file, caption, pool.submit(_store_plan_image, image_group, file))
+                    for file, caption in pending
+                ]
+                for file, caption, future in futures:
                     try:
-                        # Get caption for this image
-                        caption = captions[i] if i < len(captions) else ''
-                        
-                        # Create image instance
-                        image_data = {
-                            'image_group': image_group.id,
-                            'image': file,
-                            'caption': caption,
-                            'sort_order': len(uploaded_images)
-                        }
-                        
-                        serializer = self.get_serializer(data=image_data)
-                        if serializer.is_valid():
-                            image = serializer.save()
-                            uploaded_images.append(serializer.data)
-                        else:
-                            errors.append({
-                                'file': file.name,
-                                'errors': serializer.errors
-                            })
-                    
+                        stored.append((file, caption, future.result()))
+                    except DjangoValidationError as e:
+                        errors.append({
+                            'file': file.name,
+                            'errors': {'image': e.messages}
+                        })
                     except Exception as e:
                         errors.append({
                             'file': file.name,
                             'error': str(e)
                         })
-            
-            return Response({
-                'uploaded_images': uploaded_images,
-                'errors': errors,
-                'total_uploaded': len(uploaded_images),
-                'total_errors': len(errors)
-            })
-            
+        
+        images = [
+            ProjectPlanImage(
+                image_group=image_group,
+                image=name,
+                caption=caption or _caption_from_filename(name),
+                sort_order=sort_order,
+                file_size=file.size,
+                file_type=getattr(file, 'content_type', '') or ''
+            )
+            for sort_order, (file, caption, name) in enumerate(stored)
+        ]
+        
+        try:
+            with transaction.atomic():
+                ProjectPlanImage.objects.bulk_create(images, batch_size=PLAN_UPLOAD_BATCH_SIZE)
         except Exception as e:
+            for image in images:
+                image.image.delete(save=False)
             return Response(
                 {'error': str(e)}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
+        
+        uploaded_images = self.get_serializer(images, many=True).data
+        return Response({
+            'uploaded_images': uploaded_images,
+            'errors': errors,
+            'total_uploaded': len(uploaded_images),
+            'total_errors': len(errors)
+        })
     
     @action(detail=True, methods=['post'])
     def reorder(self, request, pk=None):
@@ -702,8 +1458,12 @@ class ProjectPlanImageViewSet(BaseModelViewSet):
             )
         
         try:
-            image.sort_order = new_order
-            image.save()
+            # Only sort_order changes; skip save() and its storage lookups for file metadata
+            image.sort_order = int(new_order)
+            image.updated_at = now()
+            ProjectPlanImage.objects.filter(pk=image.pk).update(
+                sort_order=image.sort_order, updated_at=image.updated_at
+            )
             
             return Response({
                 'message': 'Image reordered successfully',
@@ -736,8 +1496,10 @@ class ProjectCalculationAPI(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            cabinet_type = CabinetTypes.objects.get(id=cabinet_type_id)
-            cab_sqft, door_sqft = compute_sqft(cabinet_type, width_mm, depth_mm, height_mm)
+            # compute_sqft only needs the id; the row itself is never read
+            if not _cabinet_type_exists(cabinet_type_id):
+                raise CabinetTypes.DoesNotExist
+            cab_sqft, door_sqft = compute_sqft(int(cabinet_type_id), width_mm, depth_mm, height_mm)
             
             return Response({
                 'cabinet_sqft': str(cab_sqft),
@@ -772,17 +1534,12 @@ class ActiveRatesAPI(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Get active finish rates
-        finish_rates = _active_on(FinishRates.objects.all(), eff_date).select_related('material')
-        door_rates = _active_on(DoorFinishRates.objects.all(), eff_date).select_related('material')
-        brand_charges = _active_on(CabinetTypeBrandCharge.objects.all(), eff_date).select_related('cabinet_type')
+        # Rate and master-data changes bump the cache version, so it doubles as a validator
+        etag = quote_etag(f'active-rates-{eff_date.isoformat()}-{_rates_cache_version()}')
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
         
-        return Response({
-            'date': eff_date,
-            'finish_rates': FinishRatesSerializer(finish_rates, many=True).data,
-            'door_rates': DoorFinishRatesSerializer(door_rates, many=True).data,
-            'brand_charges': CabinetTypeBrandChargeSerializer(brand_charges, many=True).data
-        })
+        return Response(_active_rates_payload(eff_date), headers={'ETag': etag})
     
 
 
@@ -824,19 +1581,8 @@ class LightingRulesViewSet(BaseModelViewSet):
         if budget_tier:
             queryset = queryset.filter(budget_tier=budget_tier)
         
-        return queryset.order_by(
-            # Customer-specific rules first
-            Case(
-                When(customer__isnull=False, then=Value(0)),
-                default=Value(1)
-            ),
-            # Type-specific rules next
-            Case(
-                When(cabinet_type__isnull=False, then=Value(0)),
-                default=Value(1)
-            ),
-            '-effective_from'
-        )
+        # Customer-specific rules first, then type-specific (see LightingRules.specificity)
+        return queryset.order_by('specificity', '-effective_from')
     
     @action(detail=False, methods=['get'])
     def applicable_rules(self, request):
@@ -849,23 +1595,23 @@ class LightingRulesViewSet(BaseModelViewSet):
             project = Project.objects.get(id=project_id)
             
             # Get unique material/type combinations from project line items
-            combinations = project.lines.values(
-                'cabinet_material', 'cabinet_type',
-                'cabinet_material__name', 'cabinet_type__name'
-            ).distinct()
+            combinations = get_project_material_type_combinations(project)
+            
+            material_ids = {m for m, _ in combinations}
+            materials = _materials_by_id()
+            cabinet_types = _cabinet_types_by_id()
+            rule_buckets = get_all_applicable_lighting_rules(project, material_ids)
             
             result = []
-            for combo in combinations:
-                material_id = combo['cabinet_material']
-                type_id = combo['cabinet_type']
+            for material_id, type_id in combinations:
+                # Either map can lag a just-created row; report None rather than fail
+                material = materials.get(material_id)
+                cabinet_type = cabinet_types.get(type_id)
                 
-                material = Materials.objects.get(id=material_id)
-                cabinet_type = CabinetTypes.objects.get(id=type_id) if type_id else None
-                
-                rules = get_applicable_lighting_rules(project, material, cabinet_type)
+                rules = lighting_rules_for(rule_buckets, material_id, type_id)
                 
                 result.append({
-                    'material': MaterialsSerializer(material).data,
+                    'material': MaterialsSerializer(material).data if material else None,
                     'cabinet_type': CabinetTypesSerializer(cabinet_type).data if cabinet_type else None,
                     'applicable_rules': LightingRulesSerializer(rules, many=True).data
                 })
@@ -876,13 +1622,40 @@ class LightingRulesViewSet(BaseModelViewSet):
             return Response({'error': 'Project not found'}, status=404)
 
 
+LIGHTING_ITEM_RELATED = [
+    'cabinet_material', 'cabinet_type', 'cabinet_type__category',
+    'lighting_rule', 'lighting_rule__cabinet_material',
+    'lighting_rule__cabinet_type', 'lighting_rule__cabinet_type__category',
+    'lighting_rule__customer',
+]
+
+
 class ProjectLightingConfigurationViewSet(BaseModelViewSet):
     queryset = ProjectLightingConfiguration.objects.all().select_related('project')
     serializer_class = ProjectLightingConfigurationSerializer
-    http_method_names = ['get', 'put', 'patch', 'head', 'options']  # No create/delete
+    http_method_names = ['get', 'post', 'put', 'patch', 'head', 'options']  # POST only for actions
+    
+    def create(self, request, *args, **kwargs):
+        # Configurations are created alongside their project; POST is only open for the actions
+        return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
+    
+    # Actions that only need the config row; the serializer's item prefetch is skipped for these
+    LIGHTING_ROW_ACTIONS = ('auto_create_items', 'recalculate_totals', 'summary')
     
     def get_queryset(self):
         queryset = super().get_queryset()
+        if self.action in self.LIGHTING_ROW_ACTIONS:
+            # These only read project_id, so skip the join entirely
+            queryset = queryset.select_related(None)
+        else:
+            # The project is joined only to anchor the item prefetch; its own columns are never read
+            config_fields = [f.name for f in ProjectLightingConfiguration._meta.concrete_fields]
+            queryset = queryset.only(*config_fields, 'project__id').prefetch_related(
+                Prefetch(
+                    'project__lighting_items',
+                    queryset=ProjectLightingItem.objects.select_related(*LIGHTING_ITEM_RELATED)
+                )
+            )
         
         project_id = self.request.query_params.get('project')
         if project_id:
@@ -892,72 +1665,78 @@ class ProjectLightingConfigurationViewSet(BaseModelViewSet):
     
     @action(detail=True, methods=['post'])
     def auto_create_items(self, request, pk=None):
-        """Automatically create lighting items based on project line items"""
+        """Queue creation of lighting items based on project line items"""
         config = self.get_object()
+        task_id = enqueue_on_commit(auto_create_project_lighting, config.project_id)
         
-        with transaction.atomic():
-            created_items = auto_create_lighting_items_for_project(config.project)
-            
         return Response({
-            'message': f'Created {len(created_items)} lighting items',
-            'created_items': ProjectLightingItemSerializer(created_items, many=True).data
-        })
+            'message': 'Lighting item creation queued',
+            'task_id': task_id
+        }, status=status.HTTP_202_ACCEPTED)
     
     @action(detail=True, methods=['post'])
     def recalculate_totals(self, request, pk=None):
-        """Recalculate all lighting totals for project"""
+        """Queue recalculation of all lighting totals for project"""
         config = self.get_object()
+        task_id = enqueue_on_commit(recalc_project_lighting, config.project_id)
         
-        with transaction.atomic():
-            # Recalculate all lighting item costs
-            for item in config.project.lighting_items.filter(is_active=True):
-                item.calculate_costs()
-                item.save()
-            
-            # Recalculate project totals
-            calculate_project_lighting_totals(config.project)
-            
-        serializer = self.get_serializer(config)
-        return Response(serializer.data)
+        return Response({
+            'message': 'Lighting recalculation queued',
+            'task_id': task_id
+        }, status=status.HTTP_202_ACCEPTED)
     
     @action(detail=True, methods=['get'])
     def summary(self, request, pk=None):
         """Get lighting cost summary by material/type"""
         config = self.get_object()
         
-        items = config.project.lighting_items.filter(is_active=True)
-        summary = []
-        
-        for item in items:
-            summary.append({
-                'material': item.cabinet_material.name,
-                'cabinet_type': item.cabinet_type.name if item.cabinet_type else 'All Types',
-                'led_cost': item.led_under_wall_cost + item.led_work_top_cost + item.led_skirting_cost,
-                'spot_cost': item.spot_lights_cost,
-                'total_cost': item.total_cost,
+        # values_list follows the FKs in one JOINed SELECT; no model instances or lazy loads per item
+        items = ProjectLightingItem.objects.filter(project_id=config.project_id, is_active=True)
+        rows = items.values_list(
+            'cabinet_material__name', 'cabinet_type__name',
+            'led_under_wall_cost', 'led_work_top_cost', 'led_skirting_cost',
+            'spot_lights_cost', 'total_cost',
+            'lighting_rule__led_specification', 'lighting_rule__spot_light_specification'
+        )
+        summary = [
+            {
+                'material': material,
+                'cabinet_type': cabinet_type or 'All Types',
+                'led_cost': led_wall + led_top + led_skirting,
+                'spot_cost': spot_cost,
+                'total_cost': total_cost,
                 'specifications': {
-                    'led': item.lighting_rule.led_specification,
-                    'spot': item.lighting_rule.spot_light_specification
+                    'led': led_spec,
+                    'spot': spot_spec
                 }
-            })
+            }
+            for (material, cabinet_type, led_wall, led_top, led_skirting,
+                 spot_cost, total_cost, led_spec, spot_spec) in rows
+        ]
+        
+        totals = items.aggregate(
+            total_led=Sum(F('led_under_wall_cost') + F('led_work_top_cost') + F('led_skirting_cost')),
+            total_spot=Sum('spot_lights_cost'),
+        )
         
         return Response({
             'items': summary,
             'grand_total': config.grand_total_lighting_cost,
-            'total_led_cost': sum(item['led_cost'] for item in summary),
-            'total_spot_cost': sum(item['spot_cost'] for item in summary)
+            'total_led_cost': totals['total_led'] or 0,
+            'total_spot_cost': totals['total_spot'] or 0
         })
 
 
 
 class ProjectLightingItemViewSet(BaseModelViewSet):
-    queryset = ProjectLightingItem.objects.all().select_related(
-        'project', 'lighting_rule', 'cabinet_material', 'cabinet_type'
-    )
+    queryset = ProjectLightingItem.objects.all().select_related('project', *LIGHTING_ITEM_RELATED)
     serializer_class = ProjectLightingItemSerializer
     
     def get_queryset(self):
         queryset = super().get_queryset()
+        if self.action == 'list':
+            # Listing serializes the project as a pk; the join only matters when totals are refreshed
+            queryset = queryset.select_related(None).select_related(*LIGHTING_ITEM_RELATED)
         
         project_id = self.request.query_params.get('project')
         if project_id:
@@ -970,168 +1749,50 @@ class ProjectLightingItemViewSet(BaseModelViewSet):
             
         return queryset
     
+    def _sync_totals(self):
+        return self.request.query_params.get('sync') == '1'
+    
+    @transaction.atomic
     def perform_create(self, serializer):
-        # Automatically calculate costs on creation
+        # ProjectLightingItem.save() computes the costs, so the INSERT already carries them
         instance = serializer.save()
-        instance.calculate_costs()
-        instance.save()
         
-        # Recalculate project totals
-        calculate_project_lighting_totals(instance.project)
+        # Refresh project lighting totals (queued unless ?sync=1)
+        queue_lighting_totals(instance.project, sync=self._sync_totals())
     
+    @transaction.atomic
     def perform_update(self, serializer):
-        # Automatically recalculate costs on update
+        # Costs are recomputed by ProjectLightingItem.save() within the same UPDATE
         instance = serializer.save()
-        instance.calculate_costs()
-        instance.save()
         
-        # Recalculate project totals
-        calculate_project_lighting_totals(instance.project)
+        # Refresh project lighting totals (queued unless ?sync=1)
+        queue_lighting_totals(instance.project, sync=self._sync_totals())
     
     @action(detail=True, methods=['post'])
+    @transaction.atomic
     def recalculate(self, request, pk=None):
         """Manually recalculate costs for this lighting item"""
         item = self.get_object()
-        item.calculate_costs()
-        item.save()
+        # save() runs calculate_costs(); only the cost columns need writing
+        item.save(update_fields=ProjectLightingItem.COST_FIELDS + ['updated_at'])
         
-        # Recalculate project totals
-        calculate_project_lighting_totals(item.project)
+        # Refresh project lighting totals (queued unless ?sync=1)
+        queue_lighting_totals(item.project, sync=self._sync_totals())
         
         serializer = self.get_serializer(item)
         return Response(serializer.data)
     
     @action(detail=True, methods=['post'])
+    @transaction.atomic
     def toggle_active(self, request, pk=None):
         """Toggle active status of lighting item"""
         item = self.get_object()
+        # Costs don't depend on is_active, so only the flag needs writing
         item.is_active = not item.is_active
-        item.save()
+        item.save(update_fields=['is_active', 'updated_at'])
         
-        # Recalculate project totals
-        calculate_project_lighting_totals(item.project)
+        # Refresh project lighting totals (queued unless ?sync=1)
+        queue_lighting_totals(item.project, sync=self._sync_totals())
         
         serializer = self.get_serializer(item)
         return Response(serializer.data)
-    
-
-
-
-
-def get_applicable_lighting_rules(project, cabinet_material=None, cabinet_type=None):
-    """Get lighting rules applicable to a project"""
-    rules = LightingRules.objects.filter(
-        Q(is_global=True) | Q(customer=project.customer),
-        budget_tier=project.budget_tier,
-        is_active=True
-    )
-    
-    if cabinet_material:
-        rules = rules.filter(cabinet_material=cabinet_material)
-    
-    if cabinet_type:
-        rules = rules.filter(
-            models.Q(cabinet_type=cabinet_type) | models.Q(cabinet_type__isnull=True)
-        )
-    
-    # Order by specificity: customer-specific first, then type-specific, then general
-    return rules.order_by(
-        Case(
-            When(customer=project.customer, then=Value(0)),
-            default=Value(1)
-        ),
-        Case(
-            When(cabinet_type__isnull=False, then=Value(0)),
-            default=Value(1)
-        ),
-        '-effective_from'
-    )
-
-
-def calculate_project_lighting_totals(project):
-    """Calculate total lighting costs from all active lighting items"""
-    config, created = ProjectLightingConfiguration.objects.get_or_create(
-        project=project,
-        defaults={'work_top_length_mm': 6000}  # Default value
-    )
-    
-    # Calculate totals from line items
-    wall_items = project.lines.filter(cabinet_type__category__name='WALL')
-    base_items = project.lines.filter(cabinet_type__category__name='BASE')
-    
-    config.total_wall_cabinet_width_mm = sum(item.width_mm * item.qty for item in wall_items)
-    config.total_base_cabinet_width_mm = sum(item.width_mm * item.qty for item in base_items)
-    config.total_wall_cabinet_count = sum(item.qty for item in wall_items)
-    
-    # Calculate grand total from all lighting items
-    active_items = project.lighting_items.filter(is_active=True)
-    config.grand_total_lighting_cost = sum(item.total_cost for item in active_items)
-    
-    config.save()
-    return config
-
-
-def auto_create_lighting_items_for_project(project):
-    """Automatically create lighting items based on project line items"""
-    # Get unique material/type combinations from line items
-    combinations = project.lines.values(
-        'cabinet_material', 'cabinet_type', 
-        'cabinet_material__name', 'cabinet_type__name'
-    ).distinct()
-    
-    created_items = []
-    
-    for combo in combinations:
-        material_id = combo['cabinet_material']
-        type_id = combo['cabinet_type']
-        
-        # Check if lighting item already exists
-        existing = project.lighting_items.filter(
-            cabinet_material_id=material_id,
-            cabinet_type_id=type_id
-        ).first()
-        
-        if existing:
-            continue
-            
-        # Find applicable rule
-        material = Materials.objects.get(id=material_id)
-        cabinet_type = CabinetTypes.objects.get(id=type_id) if type_id else None
-        
-        rules = get_applicable_lighting_rules(project, material, cabinet_type)
-        rule = rules.first()
-        
-        if not rule:
-            continue
-            
-        # Calculate dimensions for this material/type combination
-        relevant_items = project.lines.filter(
-            cabinet_material_id=material_id,
-            cabinet_type_id=type_id
-        )
-        
-        wall_items = relevant_items.filter(cabinet_type__category__name='WALL')
-        base_items = relevant_items.filter(cabinet_type__category__name='BASE')
-        
-        wall_width = sum(item.width_mm * item.qty for item in wall_items)
-        base_width = sum(item.width_mm * item.qty for item in base_items)
-        wall_count = sum(item.qty for item in wall_items)
-        
-        # Create lighting item
-        lighting_item = ProjectLightingItem.objects.create(
-            project=project,
-            lighting_rule=rule,
-            cabinet_material=material,
-            cabinet_type=cabinet_type,
-            wall_cabinet_width_mm=wall_width,
-            base_cabinet_width_mm=base_width,
-            wall_cabinet_count=wall_count,
-            work_top_length_mm=wall_width if wall_width > 0 else 0  # Default to wall width
-        )
-        
-        created_items.append(lighting_item)
-    
-    # Recalculate project totals
-    calculate_project_lighting_totals(project)
-    
-    return created_items
\ No newline at end of file
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class QuotationPdfConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'quotation_pdf'
+
+    def ready(self):
+        import quotation_pdf.signals
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.3 on 2026-10-17 06:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quotation_pdf', '0002_alter_quotationpdftemplate_template_file'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quotationpdfhistory',
+            index=models.Index(fields=['project_id', 'status', '-created_at'], name='pdfhist_proj_status_created'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.1.3 on 2026-10-17 06:37
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.utils.dateparse import parse_datetime
+
+
+def copy_access_log(apps, schema_editor):
+    QuotationPDFShare = apps.get_model('quotation_pdf', 'QuotationPDFShare')
+    QuotationPDFShareAccess = apps.get_model('quotation_pdf', 'QuotationPDFShareAccess')
+    rows = []
+    for share_id, access_log in QuotationPDFShare.objects.exclude(access_log=[]).values_list('id', 'access_log'):
+        for entry in access_log or []:
+            rows.append(QuotationPDFShareAccess(
+                share_id=share_id,
+                ip_address=str(entry.get('ip') or 'unknown')[:45],
+                action=entry.get('action') or 'view',
+                accessed_at=parse_datetime(entry.get('timestamp') or '') or django.utils.timezone.now(),
+            ))
+    QuotationPDFShareAccess.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quotation_pdf', '0003_pdfhistory_project_status_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuotationPDFShareAccess',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ip_address', models.CharField(max_length=45)),
+                ('action', models.CharField(default='view', max_length=20)),
+                ('accessed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('share', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='accesses', to='quotation_pdf.quotationpdfshare')),
+            ],
+            options={
+                'verbose_name': 'PDF Share Access',
+                'verbose_name_plural': 'PDF Share Accesses',
+                'ordering': ['-accessed_at'],
+                'indexes': [models.Index(fields=['share', '-accessed_at'], name='pdfshare_access_share_time'), models.Index(fields=['share', 'ip_address'], name='pdfshare_access_share_ip')],
+            },
+        ),
+        migrations.RunPython(copy_access_log, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='quotationpdfshare',
+            name='access_log',
+        ),
+        migrations.RemoveField(
+            model_name='quotationpdfshare',
+            name='visitor_ips',
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.3 on 2026-10-17 06:43
+
+from django.db import migrations, models
+
+
+def blank_tokens_to_null(apps, schema_editor):
+    QuotationPDFHistory = apps.get_model('quotation_pdf', 'QuotationPDFHistory')
+    QuotationPDFHistory.objects.filter(share_token='').update(share_token=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quotation_pdf', '0004_share_access_log'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='quotationpdfhistory',
+            name='share_token',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+        migrations.RunPython(blank_tokens_to_null, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.3 on 2026-10-17 06:45
+
+from django.db import migrations, models
+
+
+# History rows are written in created_at order, so a BRIN index is a tiny fraction of the
+# B-tree's size and still serves the analytics created_at range filters. PostgreSQL only.
+def create_brin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS pdfhist_created_brin ON quotation_pdf_quotationpdfhistory '
+        'USING brin (created_at) WITH (pages_per_range = 32)'
+    )
+
+
+def drop_brin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS pdfhist_created_brin')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quotation_pdf', '0005_history_share_token_nullable'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='quotationpdfhistory',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True),
+        ),
+        migrations.RunPython(create_brin_index, drop_brin_index),
+    ]
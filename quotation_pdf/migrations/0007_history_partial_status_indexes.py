@@ -0,0 +1,27 @@
+# Generated by Django 5.1.3 on 2026-10-17 06:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quotation_pdf', '0006_history_created_at_brin'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='quotationpdfhistory',
+            name='quotation_p_status_d2f424_idx',
+        ),
+        migrations.AddIndex(
+            model_name='quotationpdfhistory',
+            index=models.Index(condition=models.Q(('status__in', ['GENERATING', 'FAILED'])), fields=['-created_at'], name='pdfhist_active_status'),
+        ),
+        migrations.AddIndex(
+            model_name='quotationpdfhistory',
+            index=models.Index(condition=models.Q(('status', 'ARCHIVED')), fields=['-created_at'], name='pdfhist_archived'),
+        ),
+    ]
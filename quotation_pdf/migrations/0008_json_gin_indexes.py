@@ -0,0 +1,55 @@
+# Generated by Django 5.1.3 on 2026-10-17 06:52
+
+from django.db import migrations
+
+
+# PostgreSQL-only GIN indexes for containment lookups (e.g. cc_emails__contains=['x@y.com']).
+# JSONField is jsonb on PostgreSQL; jsonb_path_ops is smaller and serves @>, which is all
+# these fields are filtered with.
+POSTGRES_INDEXES = [
+    (
+        'pdfhist_customizations_gin',
+        "CREATE INDEX IF NOT EXISTS pdfhist_customizations_gin ON quotation_pdf_quotationpdfhistory "
+        "USING gin (customizations jsonb_path_ops)",
+    ),
+    (
+        'pdfcust_plan_images_gin',
+        "CREATE INDEX IF NOT EXISTS pdfcust_plan_images_gin ON quotation_pdf_quotationpdfcustomization "
+        "USING gin (selected_plan_images jsonb_path_ops)",
+    ),
+    (
+        'emaillog_cc_gin',
+        "CREATE INDEX IF NOT EXISTS emaillog_cc_gin ON quotation_pdf_quotationpdfemaillog "
+        "USING gin (cc_emails jsonb_path_ops)",
+    ),
+    (
+        'emaillog_bcc_gin',
+        "CREATE INDEX IF NOT EXISTS emaillog_bcc_gin ON quotation_pdf_quotationpdfemaillog "
+        "USING gin (bcc_emails jsonb_path_ops)",
+    ),
+]
+
+
+def create_gin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for _name, sql in POSTGRES_INDEXES:
+        schema_editor.execute(sql)
+
+
+def drop_gin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _sql in POSTGRES_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quotation_pdf', '0007_history_partial_status_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_gin_indexes, drop_gin_indexes),
+    ]
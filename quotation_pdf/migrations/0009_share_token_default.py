@@ -0,0 +1,19 @@
+# Generated by Django 5.1.3 on 2026-10-17 06:50
+
+import quotation_pdf.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quotation_pdf', '0008_json_gin_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='quotationpdfshare',
+            name='share_token',
+            field=models.CharField(db_index=True, default=quotation_pdf.models.generate_share_token, max_length=43, unique=True),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.3 on 2026-10-17 06:52
+
+import django.db.models.expressions
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quotation_pdf', '0009_share_token_default'),
+    ]
+
+    # A regular column can't be altered into a generated one; drop it and add it back.
+    # Stored values are recomputed from total_amount - discount_applied.
+    operations = [
+        migrations.RemoveField(
+            model_name='quotationpdfhistory',
+            name='final_amount',
+        ),
+        migrations.AddField(
+            model_name='quotationpdfhistory',
+            name='final_amount',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(models.F('total_amount'), '-', models.F('discount_applied')), output_field=models.DecimalField(decimal_places=2, max_digits=12)),
+        ),
+    ]
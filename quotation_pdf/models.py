@@ -1,9 +1,12 @@
 # quotation_pdf/models.py
 
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
 from decimal import Decimal
+import secrets
 import uuid
 
 class QuotationPDFTemplate(models.Model):
@@ -56,6 +59,35 @@ class QuotationPDFTemplate(models.Model):
         super().save(*args, **kwargs)
 
 
+class QuotationPDFHistoryQuerySet(models.QuerySet):
+    def with_relations(self):
+        """Join the template and generating user for serializers that nest them"""
+        return self.select_related('template', 'generated_by')
+    
+    def with_children(self):
+        """with_relations() plus email logs (with sender) and share links, in two extra queries"""
+        return self.with_relations().prefetch_related(
+            models.Prefetch(
+                'email_logs',
+                queryset=QuotationPDFEmailLog.objects.select_related('sent_by'),
+            ),
+            'share_links',
+        )
+    
+    def for_listing(self):
+        """Defer error_message, bringing it back as failure_message only on FAILED rows"""
+        return self.defer('error_message').annotate(
+            failure_message=models.Case(
+                models.When(status='FAILED', then='error_message'),
+                default=models.Value(''),
+                output_field=models.TextField(),
+            )
+        )
+
+
+FILE_SIZE_UNITS = ('Bytes', 'KB', 'MB', 'GB')
+
+
 class QuotationPDFHistory(models.Model):
     """Store PDF generation history"""
     STATUS_CHOICES = [
@@ -96,10 +128,11 @@ class QuotationPDFHistory(models.Model):
         decimal_places=2, 
         default=Decimal('0.00')
     )
-    final_amount = models.DecimalField(
-        max_digits=12, 
-        decimal_places=2, 
-        default=Decimal('0.00')
+    # Computed and stored by the database, so it can never drift from the two inputs
+    final_amount = models.GeneratedField(
+        expression=models.F('total_amount') - models.F('discount_applied'),
+        output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        db_persist=True
     )
     currency = models.CharField(max_length=3, default='INR')
     
@@ -118,24 +151,37 @@ class QuotationPDFHistory(models.Model):
     )
     
     # Timestamps
-    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    # Append-only, so PostgreSQL gets a BRIN index for date-range scans instead of a B-tree
+    created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     # Email and sharing
     email_sent_count = models.PositiveIntegerField(default=0)
     last_emailed_at = models.DateTimeField(null=True, blank=True)
-    share_token = models.CharField(max_length=64, blank=True, unique=True)
+    share_token = models.CharField(max_length=64, blank=True, null=True, unique=True)
     share_expires_at = models.DateTimeField(null=True, blank=True)
     view_count = models.PositiveIntegerField(default=0)
     download_count = models.PositiveIntegerField(default=0)
     
+    objects = QuotationPDFHistoryQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-created_at']
         verbose_name = "PDF History"
         verbose_name_plural = "PDF History"
         indexes = [
             models.Index(fields=['project_id', '-created_at']),
-            models.Index(fields=['status', '-created_at']),
+            # Project history filtered by status (QuotationPDFHistoryView ?status=)
+            models.Index(fields=['project_id', 'status', '-created_at'], name='pdfhist_proj_status_created'),
+            # Most rows are GENERATED; only index the small in-flight/failed and archived subsets
+            models.Index(
+                fields=['-created_at'], condition=models.Q(status__in=['GENERATING', 'FAILED']),
+                name='pdfhist_active_status'
+            ),
+            models.Index(
+                fields=['-created_at'], condition=models.Q(status='ARCHIVED'),
+                name='pdfhist_archived'
+            ),
             models.Index(fields=['customer_name', '-created_at']),
         ]
     
@@ -145,18 +191,13 @@ class QuotationPDFHistory(models.Model):
     @property
     def file_size_formatted(self):
         """Return formatted file size"""
-        if not self.file_size:
+        size = self.file_size
+        if not size:
             return 'N/A'
         
-        sizes = ['Bytes', 'KB', 'MB', 'GB']
-        size = float(self.file_size)
-        i = 0
-        
-        while size >= 1024 and i < len(sizes) - 1:
-            size /= 1024
-            i += 1
-        
-        return f"{size:.1f} {sizes[i]}"
+        # Each unit is 2**10 of the previous one, so the unit index falls out of the bit length
+        unit = min((size.bit_length() - 1) // 10, len(FILE_SIZE_UNITS) - 1)
+        return f"{size / (1 << (unit * 10)):.1f} {FILE_SIZE_UNITS[unit]}"
     
     @property
     def is_expired(self):
@@ -286,6 +327,11 @@ class QuotationPDFEmailLog(models.Model):
         return f"Email to {self.recipient_email} - {self.status}"
 
 
+def generate_share_token():
+    """256 random bits, URL-safe (43 chars); collisions are not a practical concern, so no retry"""
+    return secrets.token_urlsafe(32)
+
+
 class QuotationPDFShare(models.Model):
     """Manage PDF sharing links"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -296,7 +342,7 @@ class QuotationPDFShare(models.Model):
     )
     
     # Share settings
-    share_token = models.CharField(max_length=64, unique=True, db_index=True)
+    share_token = models.CharField(max_length=43, unique=True, db_index=True, default=generate_share_token)
     password_protected = models.BooleanField(default=False)
     password_hash = models.CharField(max_length=255, blank=True)
     
@@ -324,10 +370,6 @@ class QuotationPDFShare(models.Model):
         blank=True
     )
     
-    # Visitor tracking
-    visitor_ips = models.JSONField(default=list, blank=True)
-    access_log = models.JSONField(default=list, blank=True)
-    
     class Meta:
         ordering = ['-created_at']
         verbose_name = "PDF Share Link"
@@ -361,29 +403,72 @@ class QuotationPDFShare(models.Model):
         )
     
     def log_access(self, ip_address, action='view'):
-        """Log access to share link"""
-        from django.utils import timezone
-        
-        # Update counters
-        if action == 'view':
-            self.view_count += 1
-        elif action == 'download':
-            self.download_count += 1
-        
-        # Track unique visitors
-        if ip_address not in self.visitor_ips:
-            self.visitor_ips.append(ip_address)
-            self.unique_visitors += 1
+        """
+        Log access to share link. Counters are bumped with F() in a single UPDATE that also
+        re-checks the view/download limit, so concurrent hits can neither lose increments nor
+        overshoot max_views/max_downloads. Returns False (and logs nothing) when the limit was
+        reached; counters on this instance are not refreshed.
+        """
+        now = timezone.now()
         
-        # Log detailed access
-        self.access_log.append({
-            'timestamp': timezone.now().isoformat(),
-            'ip': ip_address,
-            'action': action
-        })
-        
-        self.last_accessed_at = timezone.now()
-        self.save()
+        with transaction.atomic():
+            # Track unique visitors
+            is_new_visitor = not self.accesses.filter(ip_address=ip_address).exists()
+            
+            # Update counters, only while under the limit for this action
+            shares = QuotationPDFShare.objects.filter(pk=self.pk)
+            counters = {'last_accessed_at': now}
+            if action == 'view':
+                counters['view_count'] = models.F('view_count') + 1
+                shares = shares.filter(
+                    models.Q(max_views__isnull=True) | models.Q(view_count__lt=models.F('max_views'))
+                )
+            elif action == 'download':
+                counters['download_count'] = models.F('download_count') + 1
+                shares = shares.filter(
+                    models.Q(max_downloads__isnull=True) | models.Q(download_count__lt=models.F('max_downloads'))
+                )
+            if is_new_visitor:
+                counters['unique_visitors'] = models.F('unique_visitors') + 1
+            if not shares.update(**counters):
+                return False
+            
+            # Log detailed access
+            QuotationPDFShareAccess.objects.create(
+                share=self, ip_address=ip_address, action=action, accessed_at=now
+            )
+        return True
+
+
+class QuotationPDFShareAccess(models.Model):
+    """One row per share link access (append-only)"""
+    share = models.ForeignKey(
+        QuotationPDFShare,
+        on_delete=models.CASCADE,
+        related_name='accesses'
+    )
+    # REMOTE_ADDR, or 'unknown' when the server doesn't provide one
+    ip_address = models.CharField(max_length=45)
+    action = models.CharField(max_length=20, default='view')
+    accessed_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        ordering = ['-accessed_at']
+        verbose_name = "PDF Share Access"
+        verbose_name_plural = "PDF Share Accesses"
+        indexes = [
+            models.Index(fields=['share', '-accessed_at'], name='pdfshare_access_share_time'),
+            models.Index(fields=['share', 'ip_address'], name='pdfshare_access_share_ip'),
+        ]
+    
+    def __str__(self):
+        return f"{self.action} from {self.ip_address} at {self.accessed_at}"
+
+
+PDF_SETTINGS_CACHE_KEY = 'quotation_pdf:settings'
+# The signal's delete reaches every worker through the shared Redis cache; the short
+# timeout bounds staleness in other processes under the local LocMem fallback
+PDF_SETTINGS_CACHE_TIMEOUT = 60 * 5
 
 
 class QuotationPDFSettings(models.Model):
@@ -440,12 +525,15 @@ class QuotationPDFSettings(models.Model):
     
     @classmethod
     def get_settings(cls):
-        """Get or create settings instance"""
-        settings, created = cls.objects.get_or_create(
-            pk=1,
-            defaults={
-                'max_file_size_mb': 50,
-                'generation_timeout_seconds': 120,
-            }
-        )
-        return settings
\ No newline at end of file
+        """Get or create settings instance; cached, and cleared by quotation_pdf.signals on change"""
+        settings = cache.get(PDF_SETTINGS_CACHE_KEY)
+        if settings is None:
+            settings, created = cls.objects.get_or_create(
+                pk=1,
+                defaults={
+                    'max_file_size_mb': 50,
+                    'generation_timeout_seconds': 120,
+                }
+            )
+            cache.set(PDF_SETTINGS_CACHE_KEY, settings, PDF_SETTINGS_CACHE_TIMEOUT)
+        return settings
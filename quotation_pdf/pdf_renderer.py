@@ -1,36 +1,89 @@
 # quotation_pdf/pdf_renderer.py - FIXED to always use template
 
 import os
+import uuid
+import hashlib
+import importlib.util
 import logging
+import contextvars
+import multiprocessing
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
 from io import BytesIO
+from celery.exceptions import SoftTimeLimitExceeded
 from django.conf import settings
+from django.core.cache import caches
 from django.template.loader import render_to_string
 import sys
 import re
 
 logger = logging.getLogger('quotation_pdf')
 
-# Import checks
-WEASYPRINT_AVAILABLE = False
-WEASYPRINT_ERROR = None
-try:
-    import weasyprint
-    WEASYPRINT_AVAILABLE = True
+
+def _configure_font_cache():
+    """
+    Point fontconfig's cache at PDF_FONT_CACHE_DIR before WeasyPrint loads it. fontconfig keeps
+    its cache under $XDG_CACHE_HOME/fontconfig; an existing XDG_CACHE_HOME is left alone. Render
+    pool workers inherit the environment, so they reuse the same cache.
+    """
+    cache_dir = getattr(settings, 'PDF_FONT_CACHE_DIR', '')
+    if not cache_dir or 'XDG_CACHE_HOME' in os.environ:
+        return
+    try:
+        os.makedirs(os.path.join(cache_dir, 'fontconfig'), exist_ok=True)
+    except OSError as e:
+        logger.warning(f"Font cache directory unavailable, using fontconfig defaults: {e}")
+        return
+    os.environ['XDG_CACHE_HOME'] = cache_dir
+
+
+_configure_font_cache()
+
+# Backend checks: find_spec only locates the package, so WeasyPrint (cairo/pango/cffi) and
+# xhtml2pdf are imported on first use by a renderer, not when this module loads
+def _probe_backend(module_name):
+    """Whether a PDF backend is installed, without importing it"""
+    try:
+        return importlib.util.find_spec(module_name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+WEASYPRINT_AVAILABLE = _probe_backend('weasyprint')
+WEASYPRINT_ERROR = None if WEASYPRINT_AVAILABLE else "ImportError: No module named 'weasyprint'"
+XHTML2PDF_AVAILABLE = _probe_backend('xhtml2pdf')
+
+
+@lru_cache(maxsize=1)
+def _load_weasyprint():
+    """Import WeasyPrint once; a failed import (e.g. missing native libraries) marks it unavailable"""
+    global WEASYPRINT_AVAILABLE, WEASYPRINT_ERROR
+    try:
+        import weasyprint
+    except (ImportError, OSError) as e:
+        WEASYPRINT_AVAILABLE = False
+        WEASYPRINT_ERROR = f"{type(e).__name__}: {str(e)}"
+        logger.warning(f"WeasyPrint not available: {e}")
+        raise PDFGenerationError(f"WeasyPrint is not available: {WEASYPRINT_ERROR}")
     logger.info("WeasyPrint successfully imported")
-except ImportError as e:
-    WEASYPRINT_ERROR = f"ImportError: {str(e)}"
-    logger.warning(f"WeasyPrint not available: {e}")
-except OSError as e:
-    WEASYPRINT_ERROR = f"OSError: {str(e)}"
-    logger.warning(f"WeasyPrint dependencies not available: {e}")
-
-XHTML2PDF_AVAILABLE = False
-try:
-    from xhtml2pdf import pisa
-    XHTML2PDF_AVAILABLE = True
+    return weasyprint
+
+
+@lru_cache(maxsize=1)
+def _load_xhtml2pdf():
+    """Import xhtml2pdf's pisa once; a failed import marks it unavailable"""
+    global XHTML2PDF_AVAILABLE
+    try:
+        from xhtml2pdf import pisa
+    except ImportError as e:
+        XHTML2PDF_AVAILABLE = False
+        logger.warning(f"xhtml2pdf not available: {e}")
+        raise PDFGenerationError("xhtml2pdf is not available")
     logger.info("xhtml2pdf available")
-except ImportError as e:
-    logger.warning(f"xhtml2pdf not available: {e}")
+    return pisa
 
 
 class PDFGenerationError(Exception):
@@ -38,58 +91,277 @@ class PDFGenerationError(Exception):
     pass
 
 
+# WeasyPrint render pool
+# Each worker imports WeasyPrint and builds its FontConfiguration once, so renders skip
+# the cold import and font discovery, and run outside the request process's GIL.
+_worker_font_config = None
+_font_config_lock = threading.Lock()
+_pdf_pool = None
+_pdf_pool_lock = threading.Lock()
+
+
+def _get_font_config():
+    """This process's FontConfiguration, built once; locked because inline renders run on request threads"""
+    global _worker_font_config
+    if _worker_font_config is None:
+        with _font_config_lock:
+            if _worker_font_config is None:
+                import weasyprint
+                _worker_font_config = weasyprint.fonts.FontConfiguration()
+    return _worker_font_config
+
+
+def _init_pdf_worker():
+    """Process pool initializer: warm WeasyPrint and keep one FontConfiguration per worker"""
+    _get_font_config()
+
+
+@lru_cache(maxsize=64)
+def _load_css(path, mtime):
+    """Parsed stylesheet for a file version; mtime in the key drops stale entries on edit"""
+    import weasyprint
+    return weasyprint.CSS(filename=path, font_config=_get_font_config())
+
+
+# Render batches: documents rendered under pdf_render_batch() carry the batch id, and each
+# worker memoizes fetched resources (logos, product and plan images) for the current batch
+_current_batch = contextvars.ContextVar('pdf_render_batch', default=None)
+_worker_batch = (None, None)
+BATCH_FETCH_CACHE_SIZE = 256
+
+
+@contextmanager
+def pdf_render_batch(batch_id=None):
+    """Share fetched images across every render in the block, e.g. bulk regeneration; pass
+    the same batch_id from separate tasks to share across them"""
+    token = _current_batch.set(batch_id or uuid.uuid4().hex)
+    try:
+        yield
+    finally:
+        _current_batch.reset(token)
+
+
+def _batch_url_fetcher(batch_id):
+    """URL fetcher memoized for one batch; a new batch id starts a fresh cache"""
+    global _worker_batch
+    if _worker_batch[0] == batch_id:
+        return _worker_batch[1]
+    import weasyprint
+    
+    @lru_cache(maxsize=BATCH_FETCH_CACHE_SIZE)
+    def fetch(url):
+        result = weasyprint.default_url_fetcher(url)
+        # Buffer streamed responses so the cached entry can be served more than once
+        file_obj = result.pop('file_obj', None)
+        if file_obj is not None:
+            try:
+                result['string'] = file_obj.read()
+            finally:
+                file_obj.close()
+        return result
+    
+    def url_fetcher(url):
+        return dict(fetch(url))
+    
+    _worker_batch = (batch_id, url_fetcher)
+    return url_fetcher
+
+
+# WeasyPrint size optimisation per render purpose: the font subsetting and image
+# recompression passes pay off for stored PDFs but only slow down a browser preview
+OPTIMIZE_LEVELS = {
+    'none': (),
+    'fonts': ('fonts',),
+    'all': ('fonts', 'images'),
+}
+_current_optimize = contextvars.ContextVar('pdf_render_optimize', default='all')
+
+
+@contextmanager
+def pdf_render_optimize(level):
+    """Render with the given optimisation level ('none', 'fonts' or 'all') inside the block"""
+    if level not in OPTIMIZE_LEVELS:
+        raise ValueError(f"Unknown PDF optimize level: {level!r}")
+    token = _current_optimize.set(level)
+    try:
+        yield
+    finally:
+        _current_optimize.reset(token)
+
+
+def _render_job(html_content, css_files, base_url, batch_id=None, optimize='all'):
+    """Render one document with WeasyPrint; runs in a pool worker (or inline)"""
+    import weasyprint
+    font_config = _get_font_config()
+    
+    # Prepare stylesheets, reusing parsed CSS across renders in this worker
+    stylesheets = []
+    for css_file in css_files or ():
+        try:
+            mtime = os.stat(css_file).st_mtime_ns
+        except OSError:
+            continue
+        stylesheets.append(_load_css(css_file, mtime))
+    
+    # Create HTML document
+    url_fetcher = _batch_url_fetcher(batch_id) if batch_id else weasyprint.default_url_fetcher
+    html_doc = weasyprint.HTML(
+        string=html_content, base_url=base_url, encoding='utf-8', url_fetcher=url_fetcher
+    )
+    
+    # Generate PDF
+    return html_doc.write_pdf(
+        stylesheets=stylesheets,
+        font_config=font_config,
+        optimize_size=OPTIMIZE_LEVELS[optimize]
+    )
+
+
+def get_pdf_pool():
+    """The shared WeasyPrint process pool, started on first use; None when PDF_RENDER_WORKERS
+    is 0 or inside a daemonic process (Celery prefork workers), which can't start children"""
+    global _pdf_pool
+    workers = getattr(settings, 'PDF_RENDER_WORKERS', 0)
+    if not workers or multiprocessing.current_process().daemon:
+        return None
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            # spawn, not fork: the parent is a threaded server process
+            _pdf_pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_pdf_worker,
+            )
+            logger.info(f"Started WeasyPrint render pool with {workers} workers")
+        return _pdf_pool
+
+
+def _reset_pdf_pool():
+    """Drop a broken pool so the next render starts a fresh one"""
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is not None:
+            _pdf_pool.shutdown(wait=False, cancel_futures=True)
+            _pdf_pool = None
+
+
 class WeasyPrintRenderer:
     """HTML-to-PDF renderer using WeasyPrint - Best quality"""
     
     def __init__(self):
         if not WEASYPRINT_AVAILABLE:
             raise PDFGenerationError(f"WeasyPrint is not available: {WEASYPRINT_ERROR}")
-        self.weasyprint = weasyprint
+        self.weasyprint = _load_weasyprint()
         
     def render_pdf(self, html_content, css_files=None, base_url=None, pdf_data=None):
-        """Render HTML content to PDF using WeasyPrint"""
+        """Render HTML content to PDF using WeasyPrint, on the render pool when enabled"""
         try:
             logger.info("Starting HTML-to-PDF generation with WeasyPrint")
             
-            # Prepare stylesheets
-            stylesheets = []
-            if css_files:
-                for css_file in css_files:
-                    if os.path.exists(css_file):
-                        stylesheets.append(self.weasyprint.CSS(filename=css_file))
-                        logger.info(f"Loaded CSS file: {css_file}")
-            
-            # WeasyPrint configuration
-            font_config = self.weasyprint.fonts.FontConfiguration()
-            
-            # Create HTML document
-            html_doc = self.weasyprint.HTML(
-                string=html_content,
-                base_url=base_url or settings.BASE_DIR,
-                encoding='utf-8'
-            )
-            
-            # Generate PDF
-            pdf_bytes = html_doc.write_pdf(
-                stylesheets=stylesheets,
-                font_config=font_config,
-                optimize_size=('fonts', 'images')
+            args = (
+                html_content, list(css_files or []), str(base_url or settings.BASE_DIR),
+                _current_batch.get(), _current_optimize.get()
             )
+            pool = get_pdf_pool()
+            if pool is None:
+                pdf_bytes = _render_job(*args)
+            else:
+                timeout = getattr(settings, 'PDF_GENERATION_TIMEOUT', 120)
+                try:
+                    pdf_bytes = pool.submit(_render_job, *args).result(timeout=timeout)
+                except FutureTimeoutError:
+                    raise PDFGenerationError(f"WeasyPrint rendering timed out after {timeout}s")
+                except BrokenProcessPool:
+                    _reset_pdf_pool()
+                    raise PDFGenerationError("WeasyPrint render worker died")
             
             logger.info(f"✅ WeasyPrint PDF generation successful, size: {len(pdf_bytes)} bytes")
             return pdf_bytes
             
+        except SoftTimeLimitExceeded:
+            raise
         except Exception as e:
             logger.error(f"❌ WeasyPrint HTML-to-PDF failed: {str(e)}")
             raise PDFGenerationError(f"WeasyPrint HTML rendering failed: {str(e)}")
 
 
+# CSS that xhtml2pdf can't handle, stripped in order from the embedded stylesheets
+_XHTML2PDF_UNSUPPORTED_CSS = [
+    re.compile(pattern, re.IGNORECASE | re.MULTILINE | re.DOTALL)
+    for pattern in (
+        r'display\s*:\s*grid[^;]*;?',
+        r'display\s*:\s*flex[^;]*;?',
+        r'grid-[^:]*:[^;]*;?',
+        r'flex-[^:]*:[^;]*;?',
+        r'align-items[^:]*:[^;]*;?',
+        r'justify-content[^:]*:[^;]*;?',
+        r'transform[^:]*:[^;]*;?',
+        r'transition[^:]*:[^;]*;?',
+        r'animation[^:]*:[^;]*;?',
+        r'box-shadow[^:]*:[^;]*;?',
+        r'border-radius[^:]*:[^;]*;?',
+        r'background-image\s*:\s*linear-gradient[^;]*;?',
+        r'background-image\s*:\s*radial-gradient[^;]*;?',
+        r'[^{]*::before[^{]*{[^}]*}',
+        r'[^{]*::after[^{]*{[^}]*}',
+        r'[^{]*:hover[^{]*{[^}]*}',
+        r'@media[^{]*{[^{}]*{[^}]*}[^}]*}',
+        r'position\s*:\s*sticky[^;]*;?',
+        r'z-index[^:]*:[^;]*;?',
+    )
+]
+
+# Basic compatible styles placed ahead of the cleaned stylesheets
+_XHTML2PDF_BASE_CSS = """
+        body {
+            font-family: Arial, sans-serif;
+            font-size: 11px;
+            line-height: 1.4;
+            margin: 15px;
+            color: #000;
+        }
+        h1, h2, h3 { color: #333; font-weight: bold; margin-bottom: 10px; }
+        h1 { font-size: 20px; }
+        h2 { font-size: 16px; }
+        h3 { font-size: 14px; }
+        table { width: 100%; border-collapse: collapse; margin-bottom: 15px; }
+        table td, table th { border: 1px solid #ddd; padding: 6px; text-align: left; vertical-align: top; }
+        table th { background-color: #f5f5f5; font-weight: bold; }
+        .text-right { text-align: right; }
+        .text-center { text-align: center; }
+        .font-bold { font-weight: bold; }
+        """
+
+
+def _clean_css_for_xhtml2pdf(css_content):
+    """Remove CSS properties that xhtml2pdf can't handle"""
+    for pattern in _XHTML2PDF_UNSUPPORTED_CSS:
+        css_content = pattern.sub('', css_content)
+    return _XHTML2PDF_BASE_CSS + css_content
+
+
+@lru_cache(maxsize=32)
+def _load_compatible_css(css_versions):
+    """Cleaned, embeddable CSS for a tuple of (path, mtime) file versions"""
+    parts = []
+    for css_file, _mtime in css_versions:
+        try:
+            with open(css_file, 'r', encoding='utf-8') as f:
+                parts.append(f.read())
+            logger.info(f"Loaded CSS file: {css_file}")
+        except Exception as e:
+            logger.warning(f"Failed to read CSS file {css_file}: {e}")
+    css_content = ''.join(part + '\n' for part in parts)
+    return _clean_css_for_xhtml2pdf(css_content)
+
+
 class XHTMLToPDFRenderer:
     """HTML-to-PDF renderer using xhtml2pdf with compatibility fixes"""
     
     def __init__(self):
         if not XHTML2PDF_AVAILABLE:
             raise PDFGenerationError("xhtml2pdf is not available")
+        self.pisa = _load_xhtml2pdf()
     
     def render_pdf(self, html_content, css_files=None, base_url=None, pdf_data=None):
         """Render HTML content to PDF using xhtml2pdf with compatibility fixes"""
@@ -109,7 +381,7 @@ class XHTMLToPDFRenderer:
             result_buffer = BytesIO()
             
             # Configure xhtml2pdf with error handling
-            pisa_status = pisa.CreatePDF(
+            pisa_status = self.pisa.CreatePDF(
                 src=complete_html,
                 dest=result_buffer,
                 encoding='utf-8',
@@ -132,6 +404,8 @@ class XHTMLToPDFRenderer:
             logger.info(f"✅ xhtml2pdf PDF generation successful, size: {len(pdf_bytes)} bytes")
             return pdf_bytes
             
+        except SoftTimeLimitExceeded:
+            raise
         except Exception as e:
             logger.error(f"❌ xhtml2pdf HTML-to-PDF failed: {str(e)}")
             raise PDFGenerationError(f"xhtml2pdf HTML rendering failed: {str(e)}")
@@ -166,72 +440,14 @@ class XHTMLToPDFRenderer:
         return cleaned_html
     
     def _prepare_compatible_css(self, css_files):
-        """Prepare CSS that's compatible with xhtml2pdf"""
-        css_content = ""
-        
-        if css_files:
-            for css_file in css_files:
-                if os.path.exists(css_file):
-                    try:
-                        with open(css_file, 'r', encoding='utf-8') as f:
-                            css_content += f.read() + "\n"
-                        logger.info(f"Loaded CSS file: {css_file}")
-                    except Exception as e:
-                        logger.warning(f"Failed to read CSS file {css_file}: {e}")
-        
-        return self._clean_css_for_xhtml2pdf(css_content)
-    
-    def _clean_css_for_xhtml2pdf(self, css_content):
-        """Remove CSS properties that xhtml2pdf can't handle"""
-        
-        unsupported_patterns = [
-            r'display\s*:\s*grid[^;]*;?',
-            r'display\s*:\s*flex[^;]*;?',
-            r'grid-[^:]*:[^;]*;?',
-            r'flex-[^:]*:[^;]*;?',
-            r'align-items[^:]*:[^;]*;?',
-            r'justify-content[^:]*:[^;]*;?',
-            r'transform[^:]*:[^;]*;?',
-            r'transition[^:]*:[^;]*;?',
-            r'animation[^:]*:[^;]*;?',
-            r'box-shadow[^:]*:[^;]*;?',
-            r'border-radius[^:]*:[^;]*;?',
-            r'background-image\s*:\s*linear-gradient[^;]*;?',
-            r'background-image\s*:\s*radial-gradient[^;]*;?',
-            r'[^{]*::before[^{]*{[^}]*}',
-            r'[^{]*::after[^{]*{[^}]*}',
-            r'[^{]*:hover[^{]*{[^}]*}',
-            r'@media[^{]*{[^{}]*{[^}]*}[^}]*}',
-            r'position\s*:\s*sticky[^;]*;?',
-            r'z-index[^:]*:[^;]*;?',
-        ]
-        
-        cleaned_css = css_content
-        for pattern in unsupported_patterns:
-            cleaned_css = re.sub(pattern, '', cleaned_css, flags=re.IGNORECASE | re.MULTILINE | re.DOTALL)
-        
-        # Add basic compatible styles
-        compatible_css = """
-        body {
-            font-family: Arial, sans-serif;
-            font-size: 11px;
-            line-height: 1.4;
-            margin: 15px;
-            color: #000;
-        }
-        h1, h2, h3 { color: #333; font-weight: bold; margin-bottom: 10px; }
-        h1 { font-size: 20px; }
-        h2 { font-size: 16px; }
-        h3 { font-size: 14px; }
-        table { width: 100%; border-collapse: collapse; margin-bottom: 15px; }
-        table td, table th { border: 1px solid #ddd; padding: 6px; text-align: left; vertical-align: top; }
-        table th { background-color: #f5f5f5; font-weight: bold; }
-        .text-right { text-align: right; }
-        .text-center { text-align: center; }
-        .font-bold { font-weight: bold; }
-        """ + cleaned_css
-        
-        return compatible_css
+        """Prepare CSS that's compatible with xhtml2pdf, reusing the cleaned result while the files are unchanged"""
+        css_versions = []
+        for css_file in css_files or ():
+            try:
+                css_versions.append((css_file, os.stat(css_file).st_mtime_ns))
+            except OSError:
+                continue
+        return _load_compatible_css(tuple(css_versions))
     
     def _build_complete_html(self, html_content, css_content):
         """Build complete HTML document with embedded CSS"""
@@ -267,6 +483,13 @@ class XHTMLToPDFRenderer:
         return uri
 
 
+# Rendered PDFs are cached by content hash in their own file-based cache alias (see
+# settings.CACHES), so the bytes stay out of worker memory; larger documents are always re-rendered
+RENDER_CACHE_ALIAS = 'pdf_renders'
+RENDER_CACHE_TIMEOUT = 60 * 60 * 6
+RENDER_CACHE_MAX_BYTES = 2 * 1024 * 1024
+
+
 class HTMLOnlyPDFRenderer:
     """✅ FIXED: Always use proper templates, never generate fallback HTML"""
     
@@ -303,19 +526,47 @@ class HTMLOnlyPDFRenderer:
         error_msg = f"No compatible HTML-to-PDF renderers available. Attempted: {'; '.join(self.attempted_renderers)}"
         raise PDFGenerationError(error_msg)
     
-    def render_pdf(self, html_content, css_files=None, base_url=None, pdf_data=None):
-        """✅ FIXED: Render PDF using only proper templates"""
+    def _render_cache_key(self, html_content, css_files, base_url):
+        """Content address of a render: renderer, optimize level, HTML, base URL and each stylesheet's version"""
+        digest = hashlib.blake2b(digest_size=16)
+        for part in (self.renderer_name, _current_optimize.get(), str(base_url or ''), html_content):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        for css_file in css_files or ():
+            try:
+                mtime = os.stat(css_file).st_mtime_ns
+            except OSError:
+                mtime = 0
+            digest.update(f'{css_file}:{mtime}'.encode('utf-8'))
+            digest.update(b'\0')
+        return f'quotation_pdf:render:{digest.hexdigest()}'
+    
+    def render_pdf(self, html_content, css_files=None, base_url=None, pdf_data=None, force=False):
+        """✅ FIXED: Render PDF using only proper templates; identical inputs reuse the cached PDF unless force=True"""
         if not self.renderer:
             raise PDFGenerationError("No HTML-to-PDF renderer available")
         
+        render_cache = caches[RENDER_CACHE_ALIAS]
+        cache_key = self._render_cache_key(html_content, css_files, base_url)
+        if not force:
+            pdf_bytes = render_cache.get(cache_key)
+            if pdf_bytes is not None:
+                logger.info(f"♻️ Reusing cached render ({len(pdf_bytes)} bytes)")
+                return pdf_bytes
+        
         logger.info(f"🎨 Rendering HTML-to-PDF with {self.renderer_name}")
         
         try:
             # ✅ First attempt: Use the provided HTML template (your detailed template)
             pdf_bytes = self.renderer.render_pdf(html_content, css_files, base_url, pdf_data)
             logger.info(f"✅ Primary template rendered successfully with {self.renderer_name}")
+            if len(pdf_bytes) <= RENDER_CACHE_MAX_BYTES:
+                render_cache.set(cache_key, pdf_bytes, RENDER_CACHE_TIMEOUT)
             return pdf_bytes
                 
+        except SoftTimeLimitExceeded:
+            # Out of time (Celery soft limit): don't start a fallback render
+            raise
         except Exception as e:
             logger.error(f"❌ Primary template rendering failed with {self.renderer_name}: {str(e)}")
             
@@ -373,9 +624,16 @@ class HTMLOnlyPDFRenderer:
         }
 
 
+# Template types with plain text-and-totals layouts; xhtml2pdf renders these far faster than
+# WeasyPrint's full CSS layout, so it goes first for them when installed
+LIGHTWEIGHT_TEMPLATE_TYPES = ('SIMPLE',)
+
+
 # Factory function
-def get_pdf_renderer(prefer_weasyprint=True):
+def get_pdf_renderer(prefer_weasyprint=True, template_type=None):
     """Get compatible HTML-to-PDF renderer - template-only approach"""
+    if template_type in LIGHTWEIGHT_TEMPLATE_TYPES and XHTML2PDF_AVAILABLE:
+        prefer_weasyprint = False
     return HTMLOnlyPDFRenderer(prefer_weasyprint=prefer_weasyprint)
 
 
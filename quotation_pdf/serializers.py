@@ -64,7 +64,7 @@ class QuotationPDFHistorySerializer(serializers.ModelSerializer):
             'email_sent_count', 'view_count', 'download_count',
             'created_at', 'updated_at', 'generated_by_name'
         ]
-        read_only_fields = ['id', 'file_size_formatted', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'file_size_formatted', 'final_amount', 'created_at', 'updated_at']
 
 class QuotationPDFEmailLogSerializer(serializers.ModelSerializer):
     sent_by_name = serializers.CharField(source='sent_by.username', read_only=True)
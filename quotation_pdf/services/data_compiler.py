@@ -729,7 +729,9 @@ class QuotationPDFGenerator:
             
         # Initialize PDF renderer
         from ..pdf_renderer import get_pdf_renderer
-        self.pdf_renderer = get_pdf_renderer(prefer_weasyprint=True)
+        self.pdf_renderer = get_pdf_renderer(
+            prefer_weasyprint=True, template_type=self.customizations.get('template_type')
+        )
 
     def generate_pdf(self, project_id=None, customizations=None):
         """✅ MAIN PDF generation method with corrected template context"""
@@ -4,6 +4,7 @@ import os
 import time
 import logging
 from datetime import datetime, timedelta
+from celery.exceptions import SoftTimeLimitExceeded
 from django.template.loader import render_to_string
 from django.conf import settings
 from django.core.files.storage import default_storage
@@ -30,10 +31,13 @@ class QuotationPDFGenerator:
             
         # Initialize PDF renderer with compatibility preference
         from ..pdf_renderer import get_pdf_renderer
-        self.pdf_renderer = get_pdf_renderer(prefer_weasyprint=True)
+        self.pdf_renderer = get_pdf_renderer(
+            prefer_weasyprint=True, template_type=self.customizations.get('template_type')
+        )
 
-    def generate_pdf(self, project_id=None, customizations=None):
-        """✅ COMPLETELY FIXED - Main PDF generation method"""
+    def generate_pdf(self, project_id=None, customizations=None, history_id=None, force=False):
+        """✅ COMPLETELY FIXED - Main PDF generation method; history_id fills in a pre-created GENERATING record,
+        force=True re-renders instead of reusing a cached PDF"""
         start_time = time.time()
         
         try:
@@ -86,7 +90,7 @@ class QuotationPDFGenerator:
             
             # STEP 5: Generate PDF with appropriate CSS handling
             css_files = self.get_compatible_css_files()
-            pdf_bytes = self.render_pdf_with_compatibility(html_content, css_files, raw_pdf_data)
+            pdf_bytes = self.render_pdf_with_compatibility(html_content, css_files, raw_pdf_data, force=force)
             
             if not pdf_bytes or len(pdf_bytes) < 100:
                 raise PDFGenerationError("PDF rendering returned empty content")
@@ -94,11 +98,14 @@ class QuotationPDFGenerator:
             # STEP 6: Save PDF to storage
             pdf_filename = self.save_pdf_to_storage(pdf_bytes, raw_pdf_data)
             
-            # STEP 7: Save PDF history record
-            history_record = self.save_pdf_history(raw_pdf_data, len(pdf_bytes), pdf_filename)
-            
             generation_time = round(time.time() - start_time, 2)
             
+            # STEP 7: Save PDF history record
+            history_record = self.save_pdf_history(
+                raw_pdf_data, len(pdf_bytes), pdf_filename,
+                history_id=history_id, generation_time=generation_time
+            )
+            
             logger.info(f"🚀 PDF generation completed in {generation_time}s: {pdf_filename}")
             
             return {
@@ -120,6 +127,9 @@ class QuotationPDFGenerator:
                 'data_sections': list(raw_pdf_data.keys()) if raw_pdf_data else []
             }
             
+        except SoftTimeLimitExceeded:
+            # The Celery task records the timeout
+            raise
         except PDFGenerationError as e:
             generation_time = round(time.time() - start_time, 2)
             logger.error(f"❌ PDF generation error: {str(e)}")
@@ -404,7 +414,7 @@ class QuotationPDFGenerator:
         logger.info(f"Total CSS files loaded: {len(css_files)}")
         return css_files
     
-    def render_pdf_with_compatibility(self, html_content, css_files, pdf_data):
+    def render_pdf_with_compatibility(self, html_content, css_files, pdf_data, force=False):
         """Render PDF with compatibility handling and fallback"""
         try:
             logger.info(f"Starting PDF rendering with {self.pdf_renderer.renderer_name}")
@@ -414,12 +424,15 @@ class QuotationPDFGenerator:
                 html_content=html_content,
                 css_files=css_files,
                 base_url=settings.BASE_DIR,
-                pdf_data=pdf_data
+                pdf_data=pdf_data,
+                force=force
             )
             
             logger.info(f"PDF rendering successful with {self.pdf_renderer.renderer_name}")
             return pdf_bytes
             
+        except SoftTimeLimitExceeded:
+            raise
         except Exception as e:
             error_msg = str(e)
             logger.error(f"Primary PDF rendering failed: {error_msg}")
@@ -572,20 +585,32 @@ class QuotationPDFGenerator:
             logger.error(f"❌ Failed to save PDF to storage: {str(e)}")
             raise PDFGenerationError(f"Storage save failed: {str(e)}")
 
-    def save_pdf_history(self, pdf_data, file_size, pdf_filename):
-        """Save PDF generation history"""
+    def save_pdf_history(self, pdf_data, file_size, pdf_filename, history_id=None, generation_time=None):
+        """Save PDF generation history, completing the queued record when history_id is given"""
         try:
             # Import here to avoid circular imports
             from ..models import QuotationPDFHistory
             
+            fields = {
+                'filename': pdf_filename,
+                'file_path': f"quotation_pdfs/{pdf_filename}",
+                'file_size': file_size,
+                'generation_time_seconds': generation_time,
+            }
+            
+            if history_id:
+                QuotationPDFHistory.objects.filter(id=history_id).update(
+                    status='GENERATED', error_message='', updated_at=timezone.now(), **fields
+                )
+                logger.info(f"📝 PDF history completed: {history_id}")
+                return QuotationPDFHistory.objects.get(id=history_id)
+            
             history_record = QuotationPDFHistory.objects.create(
                 project_id=self.project_id,
-                pdf_filename=pdf_filename,
-                file_size=file_size,
+                status='GENERATED',
                 template_type=self.customizations.get('template_type', 'DETAILED'),
                 customizations=self.customizations,
-                generation_method='HTML_TO_PDF_DIRECT_FIXED',
-                renderer_used=self.pdf_renderer.renderer_name
+                **fields
             )
             
             logger.info(f"📝 PDF history saved: {history_record.id}")
@@ -0,0 +1,10 @@
+from django.db.models.signals import post_save, post_delete
+from django.core.cache import cache
+from django.dispatch import receiver
+from quotation_pdf.models import QuotationPDFSettings, PDF_SETTINGS_CACHE_KEY
+
+
+@receiver([post_save, post_delete], sender=QuotationPDFSettings)
+def invalidate_pdf_settings(sender, instance, **kwargs):
+    """Drop the cached settings singleton so the next get_settings() reads the saved row"""
+    cache.delete(PDF_SETTINGS_CACHE_KEY)
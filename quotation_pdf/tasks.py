@@ -0,0 +1,41 @@
+from celery import shared_task
+from celery.exceptions import SoftTimeLimitExceeded
+from django.conf import settings
+from django.utils import timezone
+
+from .models import QuotationPDFHistory
+from .pdf_renderer import pdf_render_batch
+from .services.pdf_generator import QuotationPDFGenerator
+
+
+# Hard kill shortly after the soft limit, in case the render ignores it (e.g. stuck in C code)
+PDF_TASK_KILL_GRACE = 30
+
+
+@shared_task(
+    bind=True,
+    soft_time_limit=settings.PDF_GENERATION_TIMEOUT,
+    time_limit=settings.PDF_GENERATION_TIMEOUT + PDF_TASK_KILL_GRACE,
+)
+def generate_quotation_pdf(self, history_id, batch_id=None):
+    """Render the PDF for a queued history record and mark it GENERATED or FAILED"""
+    history = QuotationPDFHistory.objects.get(pk=history_id)
+    # Pricing projects use integer keys; the history record stores them as UUID(int=...)
+    project_id = history.project_id.int
+    try:
+        # Tasks from one batch request share fetched images in the render workers
+        with pdf_render_batch(batch_id):
+            result = QuotationPDFGenerator(project_id, history.customizations).generate_pdf(history_id=history_id)
+        error = None if result['success'] else result['error']
+    except SoftTimeLimitExceeded:
+        # A hard time_limit kills the process before any handler runs; the soft limit lets the
+        # record be marked FAILED so status polling finishes
+        error = f'PDF generation timed out after {settings.PDF_GENERATION_TIMEOUT}s'
+    except Exception as e:
+        error = str(e)
+    if error:
+        QuotationPDFHistory.objects.filter(pk=history_id).update(
+            status='FAILED', error_message=error, updated_at=timezone.now()
+        )
+        return {'history_id': history_id, 'status': 'FAILED'}
+    return {'history_id': history_id, 'status': 'GENERATED'}
@@ -7,7 +7,8 @@ from .views.generation import (
     PreviewQuotationPDFView, 
     PDFDataPreviewView,
     PDFBatchGenerationView,
-    RegeneratePDFView
+    RegeneratePDFView,
+    PDFStatusView
 )
 from .views.management import (
     DownloadQuotationPDFView,
@@ -39,6 +40,7 @@ urlpatterns = [
     path('data-preview/<uuid:project_id>/', PDFDataPreviewView.as_view(), name='data_preview'),
     path('batch-generate/', PDFBatchGenerationView.as_view(), name='batch_generate'),
     path('regenerate/<uuid:pdf_id>/', RegeneratePDFView.as_view(), name='regenerate_pdf'),
+    path('status/<uuid:pdf_id>/', PDFStatusView.as_view(), name='pdf_status'),
     
     # =============================================================================
     # PDF MANAGEMENT ENDPOINTS  
@@ -114,12 +114,14 @@ class SavePDFCustomizationView(View):
                 defaults={'created_by': request.user if request.user.is_authenticated else None}
             )
             
-            # Update customization fields
+            # Update customization fields, tracking which ones change for the UPDATE
+            changed_fields = []
             template_type = data.get('template_type', 'DETAILED')
             if template_type:
                 try:
                     template = QuotationPDFTemplate.objects.get(template_type=template_type, is_active=True)
                     customization.template = template
+                    changed_fields.append('template')
                 except QuotationPDFTemplate.DoesNotExist:
                     pass
             
@@ -135,6 +137,7 @@ class SavePDFCustomizationView(View):
             for field in bool_fields:
                 if field in data:
                     setattr(customization, field, bool(data[field]))
+                    changed_fields.append(field)
             
             # String fields
             string_fields = [
@@ -145,18 +148,23 @@ class SavePDFCustomizationView(View):
             for field in string_fields:
                 if field in data:
                     setattr(customization, field, str(data[field]))
+                    changed_fields.append(field)
             
             # Decimal fields
             if 'discount_percentage' in data:
                 customization.discount_percentage = float(data['discount_percentage'])
+                changed_fields.append('discount_percentage')
             if 'discount_amount' in data:
                 customization.discount_amount = float(data['discount_amount'])
+                changed_fields.append('discount_amount')
             
             # JSON fields
             if 'selected_plan_images' in data:
                 customization.selected_plan_images = data['selected_plan_images']
+                changed_fields.append('selected_plan_images')
             
-            customization.save()
+            if changed_fields:
+                customization.save(update_fields=changed_fields + ['updated_at'])
             
             return JsonResponse({
                 'success': True,
@@ -343,18 +351,8 @@ class PDFSettingsView(View):
     
     def get(self, request):
         try:
-            # Get or create global settings
-            settings_obj, created = QuotationPDFSettings.objects.get_or_create(
-                pk=1,
-                defaults={
-                    'default_template_type': 'DETAILED',
-                    'max_file_size_mb': 50,
-                    'pdf_storage_days': 365,
-                    'watermark_text': '',
-                    'company_logo_url': '',
-                    'default_color_theme': 'default'
-                }
-            )
+            # Get or create global settings (cached singleton)
+            settings_obj = QuotationPDFSettings.get_settings()
             
             settings_data = {
                 'default_template_type': settings_obj.default_template_type,
@@ -389,11 +387,17 @@ class PDFSettingsView(View):
                 'auto_cleanup_enabled', 'email_notifications_enabled'
             ]
             
+            # Keys without a matching column are accepted but not stored
+            model_fields = {field.name for field in QuotationPDFSettings._meta.concrete_fields}
+            changed_fields = []
             for field in updatable_fields:
                 if field in data:
                     setattr(settings_obj, field, data[field])
+                    if field in model_fields:
+                        changed_fields.append(field)
             
-            settings_obj.save()
+            if changed_fields:
+                settings_obj.save(update_fields=changed_fields + ['updated_at'])
             
             return JsonResponse({
                 'success': True,
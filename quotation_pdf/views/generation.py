@@ -4,10 +4,11 @@ from django.views import View
 from django.shortcuts import get_object_or_404
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
+from django.db import transaction
+from django.urls import reverse
 import json
 import logging
-
-import time
+import uuid
 
 
 from ..services.pdf_generator import QuotationPDFGenerator
@@ -17,6 +18,8 @@ from ..services.data_compiler import QuotationPDFDataCompiler
 from ..models import (
     QuotationPDFHistory
 )
+from ..pdf_renderer import pdf_render_optimize
+from ..tasks import generate_quotation_pdf
 from pricing.models import Project
 
 logger = logging.getLogger('quotation_pdf')
@@ -26,18 +29,15 @@ logger = logging.getLogger('quotation_pdf')
 
 @method_decorator(csrf_exempt, name='dispatch')
 class GenerateQuotationPDFView(View):
-    """Generate PDF quotation with heavy dependencies"""
+    """Queue PDF generation; the render runs on a Celery worker and is polled via the status URL"""
     
     def post(self, request, project_id):
-        start_time = time.time()
-        
         try:
             logger.info(f"PDF generation request for project {project_id}")
             
             # Validate project exists
-            try:
-                project = Project.objects.get(id=project_id)
-            except Project.DoesNotExist:
+            project = Project.objects.filter(id=project_id).only('id').first()
+            if project is None:
                 return JsonResponse({
                     'success': False,
                     'error': f'Project with ID {project_id} not found'
@@ -57,66 +57,58 @@ class GenerateQuotationPDFView(View):
             
             logger.info(f"PDF customizations: {customizations}")
             
-            # Generate PDF using the heavy dependencies
-            generator = QuotationPDFGenerator(project_id, customizations)
-            result = generator.generate_pdf()
+            with transaction.atomic():
+                history_record = QuotationPDFHistory.objects.create(
+                    project_id=project.id,
+                    status='GENERATING',
+                    template_type=customizations.get('template_type', 'DETAILED'),
+                    customizations=customizations,
+                    generated_by=request.user if request.user.is_authenticated else None
+                )
+                history_id = str(history_record.id)
+                transaction.on_commit(lambda: generate_quotation_pdf.delay(history_id))
             
-            generation_time = time.time() - start_time
-            logger.info(f"PDF generation completed in {generation_time:.2f} seconds")
-            
-            if result['success']:
-                # Return success response with download info
-                response_data = {
-                    'success': True,
-                    'message': 'PDF generated successfully',
-                    'filename': result['filename'],
-                    'file_size': result['file_size'],
-                    'file_size_formatted': self._format_file_size(result['file_size']),
-                    'download_url': result['download_url'],
-                    'generation_time': round(generation_time, 2),
-                    'template_type': customizations.get('template_type', 'DETAILED'),
-                    'project_id': str(project_id),
-                    'history_id': str(result.get('history_id')) if result.get('history_id') else None
-                }
-                
-                # Update history record with generation time
-                if result.get('history_id'):
-                    try:
-                        history_record = QuotationPDFHistory.objects.get(id=result['history_id'])
-                        history_record.generation_time_seconds = generation_time
-                        history_record.save()
-                    except QuotationPDFHistory.DoesNotExist:
-                        pass
-                
-                return JsonResponse(response_data, status=200)
-            else:
-                # Return error response
-                return JsonResponse({
-                    'success': False,
-                    'error': result['error'],
-                    'generation_time': round(generation_time, 2)
-                }, status=500)
+            return JsonResponse({
+                'success': True,
+                'message': 'PDF generation queued',
+                'status': 'GENERATING',
+                'history_id': history_id,
+                'status_url': reverse('quotation_pdf:pdf_status', args=[history_id]),
+                'template_type': customizations.get('template_type', 'DETAILED'),
+                'project_id': str(project_id)
+            }, status=202)
                 
         except Exception as e:
-            generation_time = time.time() - start_time
-            logger.error(f"Unexpected error in PDF generation: {str(e)}")
+            logger.error(f"Unexpected error queueing PDF generation: {str(e)}")
             return JsonResponse({
                 'success': False,
-                'error': f'Unexpected error: {str(e)}',
-                'generation_time': round(generation_time, 2)
+                'error': f'Unexpected error: {str(e)}'
             }, status=500)
     
-    def _format_file_size(self, bytes_size):
-        """Format file size in human readable format"""
-        if not bytes_size:
-            return 'N/A'
-        
-        for unit in ['B', 'KB', 'MB', 'GB']:
-            if bytes_size < 1024.0:
-                return f"{bytes_size:.1f} {unit}"
-            bytes_size /= 1024.0
-        return f"{bytes_size:.1f} TB"
+
+class PDFStatusView(View):
+    """Poll the state of a queued PDF generation"""
     
+    def get(self, request, pdf_id):
+        pdf_record = get_object_or_404(
+            QuotationPDFHistory.objects.only('id', 'status', 'filename', 'file_size', 'generation_time_seconds', 'error_message'),
+            id=pdf_id
+        )
+        response_data = {
+            'history_id': str(pdf_record.id),
+            'status': pdf_record.status
+        }
+        if pdf_record.status == 'GENERATED':
+            response_data.update({
+                'filename': pdf_record.filename,
+                'file_size': pdf_record.file_size,
+                'generation_time': pdf_record.generation_time_seconds,
+                'download_url': reverse('quotation_pdf:download_pdf', args=[pdf_record.id])
+            })
+        elif pdf_record.status == 'FAILED':
+            response_data['error'] = pdf_record.error_message
+        return JsonResponse(response_data)
+
 
 class PreviewQuotationPDFView(View):
     """Preview PDF in browser"""
@@ -132,9 +124,10 @@ class PreviewQuotationPDFView(View):
                 except json.JSONDecodeError:
                     pass
             
-            # Generate PDF preview
+            # Generate PDF preview; skip the size optimisation passes for an inline view
             generator = QuotationPDFGenerator(project_id, customizations)
-            result = generator.generate_pdf()
+            with pdf_render_optimize('none'):
+                result = generator.generate_pdf()
             
             if result['success']:
                 # Return PDF for preview
@@ -230,7 +223,7 @@ class PDFDataPreviewView(View):
     
 
 class PDFBatchGenerationView(View):
-    """Generate PDFs for multiple projects"""
+    """Queue PDF generation for multiple projects; each project renders as its own task on the pdf queue"""
     
     def post(self, request):
         try:
@@ -243,39 +236,69 @@ class PDFBatchGenerationView(View):
                     'error': 'No project IDs provided'
                 }, status=400)
             
-            results = []
-            
+            # Resolve every requested project in one query
+            requested_ids = {}
             for project_id in project_ids:
                 try:
-                    # Generate PDF for each project
-                    generator = QuotationPDFGenerator(project_id, batch_customizations)
-                    result = generator.generate_pdf()
-                    
-                    results.append({
-                        'project_id': str(project_id),
-                        'success': result['success'],
-                        'filename': result.get('filename'),
-                        'error': result.get('error')
-                    })
-                    
-                except Exception as e:
+                    requested_ids[str(project_id)] = int(project_id)
+                except (TypeError, ValueError):
+                    requested_ids[str(project_id)] = None
+            existing_ids = set(Project.objects.filter(
+                id__in=[pk for pk in requested_ids.values() if pk is not None]
+            ).values_list('id', flat=True))
+            
+            generated_by = request.user if request.user.is_authenticated else None
+            history_records = {
+                key: QuotationPDFHistory(
+                    project_id=pk,
+                    status='GENERATING',
+                    template_type=batch_customizations.get('template_type', 'DETAILED'),
+                    customizations=batch_customizations,
+                    generated_by=generated_by
+                )
+                for key, pk in requested_ids.items() if pk in existing_ids
+            }
+            
+            # All tasks share one render batch id, so render workers fetch logos and images once
+            batch_id = uuid.uuid4().hex
+            with transaction.atomic():
+                QuotationPDFHistory.objects.bulk_create(history_records.values())
+                history_ids = [str(record.id) for record in history_records.values()]
+                
+                def queue_batch():
+                    for history_id in history_ids:
+                        generate_quotation_pdf.delay(history_id, batch_id)
+                transaction.on_commit(queue_batch)
+            
+            results = []
+            for key in requested_ids:
+                record = history_records.get(key)
+                if record is None:
                     results.append({
-                        'project_id': str(project_id),
+                        'project_id': key,
                         'success': False,
-                        'error': str(e)
+                        'error': f'Project with ID {key} not found'
                     })
+                    continue
+                results.append({
+                    'project_id': key,
+                    'success': True,
+                    'status': 'GENERATING',
+                    'history_id': str(record.id),
+                    'status_url': reverse('quotation_pdf:pdf_status', args=[record.id])
+                })
             
             # Summary statistics
-            successful = sum(1 for r in results if r['success'])
-            failed = len(results) - successful
+            queued = len(history_records)
+            failed = len(results) - queued
             
             return JsonResponse({
                 'success': True,
                 'total_processed': len(results),
-                'successful': successful,
+                'queued': queued,
                 'failed': failed,
                 'results': results
-            })
+            }, status=202)
             
         except Exception as e:
             logger.error(f"Error in batch PDF generation: {str(e)}")
@@ -304,14 +327,14 @@ class RegeneratePDFView(View):
             # Use original customizations if no new ones provided
             customizations = new_customizations if new_customizations else original_pdf.customizations
             
-            # Generate new PDF
+            # Generate new PDF; a regeneration always re-renders rather than reusing a cached render
             generator = QuotationPDFGenerator(original_pdf.project_id, customizations)
-            result = generator.generate_pdf()
+            result = generator.generate_pdf(force=True)
             
             if result['success']:
                 # Mark old PDF as replaced
                 original_pdf.status = 'REPLACED'
-                original_pdf.save()
+                original_pdf.save(update_fields=['status', 'updated_at'])
                 
                 return JsonResponse({
                     'success': True,
@@ -1,7 +1,8 @@
-from django.http import JsonResponse, HttpResponse
+from django.http import FileResponse, JsonResponse
 from django.views import View
 from django.core.files.storage import default_storage
 from django.shortcuts import get_object_or_404
+from django.db.models import F
 import logging
 
 
@@ -32,11 +33,9 @@ class DownloadQuotationPDFView(View):
                     'error': 'PDF file not found'
                 }, status=404)
             
-            # Get file content
+            # Open the file; FileResponse streams it in chunks and closes it when done
             try:
                 file_obj = default_storage.open(file_path, 'rb')
-                file_content = file_obj.read()
-                file_obj.close()
             except Exception as e:
                 logger.error(f"Error reading PDF file {file_path}: {str(e)}")
                 return JsonResponse({
@@ -44,13 +43,15 @@ class DownloadQuotationPDFView(View):
                 }, status=500)
             
             # Update download count
-            pdf_record.download_count += 1
-            pdf_record.save()
+            QuotationPDFHistory.objects.filter(pk=pdf_record.pk).update(
+                download_count=F('download_count') + 1
+            )
             
-            # Return PDF response
-            response = HttpResponse(file_content, content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="{pdf_record.filename}"'
-            response['Content-Length'] = len(file_content)
+            # Return PDF response (Content-Length is taken from the file size)
+            response = FileResponse(
+                file_obj, as_attachment=True, filename=pdf_record.filename,
+                content_type='application/pdf'
+            )
             
             logger.info(f"PDF downloaded: {pdf_record.filename}")
             return response
@@ -70,7 +71,7 @@ class QuotationPDFHistoryView(View):
             # Get PDF history for the project
             history_qs = QuotationPDFHistory.objects.filter(
                 project_id=project_id
-            ).order_by('-created_at')
+            ).for_listing().order_by('-created_at')
             
             # Apply filters if provided
             status_filter = request.GET.get('status')
@@ -104,7 +105,7 @@ class QuotationPDFHistoryView(View):
                     'currency': record.currency,
                     'status': record.status,
                     'generation_time_seconds': record.generation_time_seconds,
-                    'error_message': record.error_message,
+                    'error_message': record.failure_message,
                     'email_sent_count': record.email_sent_count,
                     'download_count': record.download_count,
                     'view_count': record.view_count,
@@ -175,6 +176,9 @@ class PDFAnalyticsView(View):
             successful_pdfs = queryset.filter(status='COMPLETED').count()
             failed_pdfs = queryset.filter(status='FAILED').count()
             
+            # Per-record statistics only need these columns; skip the JSON and text fields
+            queryset = queryset.only('id', 'template_type', 'download_count', 'generation_time_seconds', 'file_size')
+            
             # Template usage statistics
             template_stats = {}
             for record in queryset:
@@ -1,9 +1,11 @@
 
-from django.http import JsonResponse, HttpResponse
+from django.http import FileResponse, JsonResponse
 from django.views import View
 
 from django.conf import settings
 from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F
 from django.utils import timezone
 from django.shortcuts import get_object_or_404
 from django.core.mail import EmailMessage
@@ -14,18 +16,27 @@ import json
 import logging
 from datetime import timedelta
 
-import secrets
-
 
 from ..models import (
     QuotationPDFHistory,
-
+    QuotationPDFEmailLog,
     QuotationPDFShare  # Use this instead of QuotationPDFShareLink
 )
 from pricing.models import Project
 
 logger = logging.getLogger('quotation_pdf')
 
+EMAIL_LOG_BATCH_SIZE = 500
+
+
+def _email_list(value):
+    """Accept a single address, a comma-separated string or a list of addresses"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(',')
+    return [email.strip() for email in value if email and email.strip()]
+
 
 
 class EmailQuotationPDFView(View):
@@ -39,11 +50,13 @@ class EmailQuotationPDFView(View):
             # Parse request data
             data = json.loads(request.body) if request.content_type == 'application/json' else request.POST
             
-            recipient_email = data.get('recipient_email')
+            recipients = _email_list(data.get('recipient_email'))
+            cc_emails = _email_list(data.get('cc_emails'))
+            bcc_emails = _email_list(data.get('bcc_emails'))
             subject = data.get('subject', f'Kitchen Quotation - {pdf_record.project_name}')
             message = data.get('message', 'Please find attached your kitchen quotation.')
             
-            if not recipient_email:
+            if not recipients:
                 return JsonResponse({
                     'error': 'Recipient email is required'
                 }, status=400)
@@ -59,26 +72,51 @@ class EmailQuotationPDFView(View):
             file_content = file_obj.read()
             file_obj.close()
             
+            # One PENDING log per recipient, written in a single multi-row INSERT
+            sent_by = request.user if request.user.is_authenticated else None
+            with transaction.atomic():
+                email_logs = QuotationPDFEmailLog.objects.bulk_create([
+                    QuotationPDFEmailLog(
+                        pdf_history=pdf_record,
+                        recipient_email=recipient,
+                        cc_emails=cc_emails,
+                        bcc_emails=bcc_emails,
+                        subject=subject,
+                        message=message,
+                        sent_by=sent_by
+                    )
+                    for recipient in recipients
+                ], batch_size=EMAIL_LOG_BATCH_SIZE)
+            log_ids = [log.id for log in email_logs]
+            
             # Create email
             email = EmailMessage(
                 subject=subject,
                 body=message,
                 from_email=settings.DEFAULT_FROM_EMAIL,
-                to=[recipient_email]
+                to=recipients,
+                cc=cc_emails,
+                bcc=bcc_emails
             )
             
             # Attach PDF
             email.attach(pdf_record.filename, file_content, 'application/pdf')
             
-            # Send email
-            email.send()
+            # Send email, then settle every log row with one UPDATE
+            try:
+                email.send()
+            except Exception as e:
+                QuotationPDFEmailLog.objects.filter(pk__in=log_ids).update(status='FAILED', error_message=str(e))
+                raise
+            QuotationPDFEmailLog.objects.filter(pk__in=log_ids).update(status='SENT')
             
             # Update email count
-            pdf_record.email_sent_count += 1
-            pdf_record.last_emailed_at = timezone.now()
-            pdf_record.save()
+            QuotationPDFHistory.objects.filter(pk=pdf_record.pk).update(
+                email_sent_count=F('email_sent_count') + 1,
+                last_emailed_at=timezone.now()
+            )
             
-            logger.info(f"PDF emailed successfully: {pdf_record.filename} to {recipient_email}")
+            logger.info(f"PDF emailed successfully: {pdf_record.filename} to {', '.join(recipients)}")
             
             return JsonResponse({
                 'success': True,
@@ -107,7 +145,6 @@ class CreatePDFShareLinkView(View):
             # Create share link
             share_link = QuotationPDFShare.objects.create(
                 pdf_history=pdf_record,
-                share_token=secrets.token_urlsafe(32),
                 expires_at=timezone.now() + timedelta(days=data.get('expires_days', 30)),
                 max_downloads=data.get('max_downloads', 10),
                 max_views=data.get('max_views', 50),
@@ -140,8 +177,10 @@ class SharedPDFView(View):
     
     def get(self, request, token):
         try:
-            # Get share link
-            share_link = get_object_or_404(QuotationPDFShare, share_token=token)
+            # Get share link, with its PDF record in the same query (unique index on share_token)
+            share_link = get_object_or_404(
+                QuotationPDFShare.objects.select_related('pdf_history'), share_token=token
+            )
             
             # Check if link is still valid
             if not share_link.can_access():
@@ -161,26 +200,20 @@ class SharedPDFView(View):
             # Determine action (view or download)
             action = request.GET.get('action', 'view')
             
-            # Log access
+            # Log access; the counter update enforces the limit atomically
             client_ip = request.META.get('REMOTE_ADDR', 'unknown')
-            share_link.log_access(client_ip, action)
+            if not share_link.log_access(client_ip, action):
+                return JsonResponse({
+                    'error': 'Share link has expired or reached access limits'
+                }, status=403)
             
-            # Get file content
+            # Stream the file rather than reading it into memory; FileResponse sets
+            # Content-Length and the attachment/inline disposition
             file_obj = default_storage.open(pdf_record.file_path, 'rb')
-            file_content = file_obj.read()
-            file_obj.close()
-            
-            # Return PDF response
-            response = HttpResponse(file_content, content_type='application/pdf')
-            
-            if action == 'download':
-                response['Content-Disposition'] = f'attachment; filename="{pdf_record.filename}"'
-            else:
-                response['Content-Disposition'] = f'inline; filename="{pdf_record.filename}"'
-            
-            response['Content-Length'] = len(file_content)
-            
-            return response
+            return FileResponse(
+                file_obj, as_attachment=(action == 'download'), filename=pdf_record.filename,
+                content_type='application/pdf'
+            )
             
         except Exception as e:
             logger.error(f"Error accessing shared PDF: {str(e)}")
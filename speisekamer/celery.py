@@ -0,0 +1,13 @@
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'speisekamer.settings')
+
+app = Celery('speisekamer')
+
+# Read CELERY_* keys from Django settings
+app.config_from_object('django.conf:settings', namespace='CELERY')
+
+# Load tasks.py from every installed app
+app.autodiscover_tasks()
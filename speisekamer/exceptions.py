@@ -0,0 +1,28 @@
+from django.apps import apps
+from django.db import IntegrityError
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import exception_handler as drf_exception_handler
+
+
+def _constraint_message(exc):
+    """violation_error_message of the model constraint named in a database error, if any"""
+    text = str(exc)
+    for model in apps.get_models():
+        for constraint in model._meta.constraints:
+            if constraint.name in text:
+                return constraint.get_violation_error_message()
+    return None
+
+
+def exception_handler(exc, context):
+    """
+    DRF's handler, plus database constraint violations reported as 400s instead of 500s,
+    so rules enforced by the schema (e.g. CheckConstraint) don't need a Python twin.
+    """
+    if isinstance(exc, IntegrityError):
+        return Response(
+            {'error': _constraint_message(exc) or str(exc)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return drf_exception_handler(exc, context)
@@ -73,6 +73,7 @@ INSTALLED_APPS = [
     'rest_framework_simplejwt',
     'rest_framework_simplejwt.token_blacklist',
     'corsheaders',
+    'django_filters',
 
 
     # Your apps
@@ -135,6 +136,27 @@ DATABASES = {
     }
 }
 
+# Production: DATABASE_URL=postgres://... (put pgbouncer in transaction mode in front of it).
+# Connections are reused across requests instead of being opened per request; set
+# DB_POOL_MAX_SIZE to use Django's psycopg 3 pool instead (needs psycopg[pool]).
+if os.getenv('DATABASE_URL'):
+    import dj_database_url
+
+    DATABASES['default'] = dj_database_url.parse(
+        os.environ['DATABASE_URL'],
+        conn_max_age=int(os.getenv('DB_CONN_MAX_AGE', '60')),
+        conn_health_checks=True,
+        # Server-side cursors (QuerySet.iterator) break under pgbouncer transaction pooling
+        disable_server_side_cursors=os.getenv('DB_TRANSACTION_POOLING', '').lower() in ('1', 'true', 'yes'),
+    )
+    if os.getenv('DB_POOL_MAX_SIZE'):
+        # Pooled connections must not also be persistent
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '4')),
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE')),
+        }
+
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
@@ -180,6 +202,13 @@ WEASYPRINT_FONT_PATHS = [
 # PDF generation timeout (seconds)
 PDF_GENERATION_TIMEOUT = 120
 
+# WeasyPrint render worker processes; 0 renders inside the request process.
+# Celery prefork workers always render in-process (daemonic processes can't have children)
+PDF_RENDER_WORKERS = int(os.environ.get('PDF_RENDER_WORKERS', 2))
+
+# Persistent fontconfig cache, so new processes don't rescan the system fonts (empty to disable)
+PDF_FONT_CACHE_DIR = os.environ.get('PDF_FONT_CACHE_DIR', os.path.join(BASE_DIR, '.fc-cache'))
+
 
 # Enable/disable PDF generation features
 PDF_FEATURES = {
@@ -334,6 +363,70 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'speisekamer.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'EXCEPTION_HANDLER': 'speisekamer.exceptions.exception_handler',
+}
+
+# Pricing
+# Serve the project totals list from live aggregates instead of the stored ProjectTotals rows
+PRICING_LIVE_TOTALS = os.getenv('PRICING_LIVE_TOTALS', '').lower() in ('1', 'true', 'yes')
+
+# Celery
+# Without a broker configured, tasks run inline so local development needs no worker
+CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', '')
+# Task states (e.g. recalc_status polling) need a result backend; a Redis broker doubles as one
+CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', '') or (
+    CELERY_BROKER_URL if CELERY_BROKER_URL.startswith(('redis://', 'rediss://')) else ''
+)
+CELERY_TASK_ALWAYS_EAGER = not CELERY_BROKER_URL
+CELERY_TASK_EAGER_PROPAGATES = True
+CELERY_TASK_SERIALIZER = 'json'
+CELERY_RESULT_SERIALIZER = 'json'
+CELERY_ACCEPT_CONTENT = ['json']
+# PDF renders go to their own queue so they scale separately (e.g. `celery -A speisekamer worker -Q pdf -c <2x CPUs>`)
+CELERY_TASK_ROUTES = {
+    'quotation_pdf.tasks.generate_quotation_pdf': {'queue': 'pdf'},
+}
+CELERY_TIMEZONE = 'UTC'
+
+# Cache
+# Cached rates, version keys and task locks must be visible to every web and Celery process,
+# so production uses Redis: CACHE_URL=redis://..., falling back to a Redis Celery broker.
+# The per-process LocMem cache is only for single-process local development.
+CACHE_URL = os.getenv('CACHE_URL', '')
+if not CACHE_URL and CELERY_BROKER_URL.startswith(('redis://', 'rediss://')):
+    CACHE_URL = CELERY_BROKER_URL
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+            'KEY_PREFIX': os.getenv('CACHE_KEY_PREFIX', 'speisekamer'),
+        },
+    }
+elif CELERY_BROKER_URL:
+    from django.core.exceptions import ImproperlyConfigured
+
+    raise ImproperlyConfigured(
+        'CELERY_BROKER_URL is set without a shared cache; set CACHE_URL=redis://... so '
+        'the web and worker processes see the same cache.'
+    )
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    }
+
+# Rendered PDF bytes (quotation_pdf.pdf_renderer) live on disk, shared by the processes on a
+# host, rather than in worker memory: at most MAX_ENTRIES renders of up to 2MB each
+CACHES['pdf_renders'] = {
+    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+    'LOCATION': os.environ.get('PDF_RENDER_CACHE_DIR', os.path.join(BASE_DIR, '.pdf-render-cache')),
+    'OPTIONS': {'MAX_ENTRIES': 100},
 }
 
 # CORS